@@ -0,0 +1,117 @@
+# ─── APPROXIMATE NEAREST-NEIGHBOUR (IVF) INDEX ──────────────
+#
+# Inverted-file index for large KBs. Spherical k-means splits the
+# (unit-length) rows into `nlist` lists; a query scores the centroids,
+# opens the `nprobe` closest lists and scores only their rows exactly.
+# Lists are stored flat: `order` holds row ids grouped by list and
+# `offsets[i]:offsets[i+1]` is list i, so loading is three array reads.
+#
+# nprobe is the recall/latency knob: nprobe = nlist is exact search.
+# IVFIndex.search has the same signature and results as
+# VectorIndex.search, so callers don't care which one they hold.
+#
+# Given a `quantized` Int8Index / PQIndex over the same rows, probed rows
+# are scored from its codes and only its re-rank shortlist is read from
+# the float32 mmap, so KB_QUANTIZATION also applies to large (IVF) KBs.
+#
+import os
+import numpy as np
+
+from retrieval import EMPTY_RESULT, normalise_rows, top_k, unit_query
+
+ANN_NPROBE    = int(os.getenv("ANN_NPROBE", "16"))
+ANN_MIN_ROWS  = int(os.getenv("ANN_MIN_ROWS", "20000"))     # below this exact search is as fast
+KMEANS_ITERS  = 12
+KMEANS_SAMPLE = 64          # training rows per list
+
+
+def default_nlist(n: int) -> int:
+    return max(1, int(2 * np.sqrt(n)))
+
+
+def _assign(matrix, centroids, block: int = 8192) -> np.ndarray:
+    """Index of the closest centroid for every row, in blocks to bound memory."""
+    out = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), block):
+        out[start:start + block] = np.argmax(np.asarray(matrix[start:start + block]) @ centroids.T, axis=1)
+    return out
+
+
+def kmeans(matrix, nlist: int, iters: int = KMEANS_ITERS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of `matrix`; returns (nlist, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    nlist = min(nlist, n)
+    sample_ids = np.sort(rng.choice(n, size=min(n, nlist * KMEANS_SAMPLE), replace=False))
+    sample = np.asarray(matrix[sample_ids], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iters):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            # re-seed empty lists with random sample rows
+            sums[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+        centroids = normalise_rows(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Cosine top-k over `matrix` using inverted lists; see module comment."""
+
+    def __init__(self, matrix, centroids, order, offsets, nprobe: int = ANN_NPROBE, quantized=None):
+        self.matrix = matrix
+        self.quantized = quantized
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order)
+        self.offsets = np.asarray(offsets)
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, matrix, nlist: int = None, nprobe: int = ANN_NPROBE, seed: int = 0):
+        """`matrix` must already be row-normalised."""
+        centroids = kmeans(matrix, nlist or default_nlist(len(matrix)), seed=seed)
+        labels = _assign(matrix, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=offsets[1:])
+        return cls(matrix, centroids, order, offsets, nprobe)
+
+    def save(self, f) -> None:
+        np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path: str, matrix, nprobe: int = ANN_NPROBE, quantized=None):
+        with np.load(path) as data:
+            return cls(matrix, data["centroids"], data["order"], data["offsets"], nprobe, quantized)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        rows = self.matrix.nbytes if self.quantized is None else self.quantized.nbytes
+        return rows + self.centroids.nbytes + self.order.nbytes + self.offsets.nbytes
+
+    def search(self, q_vec, k, threshold=None, nprobe: int = None):
+        """Return (scores, indices) of the best `k` rows among the `nprobe` closest lists."""
+        q = unit_query(q_vec)
+        if q is None or not len(self) or k <= 0:
+            return EMPTY_RESULT
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        _, lists = top_k(self.centroids @ q, nprobe)
+        ids = np.sort(np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists]))
+        if not len(ids):
+            return EMPTY_RESULT
+        if self.quantized is not None:
+            top, idx = self.quantized.search_rows(q, ids, k, threshold)
+            return top, idx.astype(np.intp)
+        top, pos = top_k(np.asarray(self.matrix[ids]) @ q, k, threshold)
+        return top, ids[pos].astype(np.intp)
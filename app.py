@@ -1,15 +1,26 @@
 import os
 import json
-import pickle
+import hashlib
 import re
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from markdown import markdown
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 from openai import OpenAI
 from dotenv import load_dotenv
 from markdownify import markdownify as html_to_markdown
+from postprocess import postprocess_reply
+from linker import site_anchors
+from lexical import hybrid_search
+from embed_cache import EmbeddingCache, embed_with_cache
+from tenants import (DEFAULT_TENANT, Tenant, TemplateLibrary, TenantRegistry, UnknownTenant,
+                     load_kb, load_tenant_config, resolve_tenant, tenant_dir)
+from embed_batcher import EmbeddingBatcher
+from pipeline import Finish, Stage, run_stages
+from sentiment_model import load_model, log_example
+from reply_cache import ReplyCache, make_key
+import metrics
 
 
 def parse_url_box(url_text):
@@ -27,21 +38,9 @@ def parse_url_box(url_text):
 
 
 
-def insert_links(text, url_map):
-    """
-    Finds any words/phrases in the text that match the anchors and replaces
-    them with Markdown links (e.g. Head → [Head](...)).
-    """
-    def safe_replace(match):
-        word = match.group(0)
-        for anchor, url in url_map.items():
-            if word.lower() == anchor.lower():
-                return f"[{word}]({url})"
-        return word
-
-    sorted_anchors = sorted(url_map.keys(), key=len, reverse=True)
-    pattern = r'\b(' + '|'.join(re.escape(a) for a in sorted_anchors) + r')\b'
-    return re.sub(pattern, safe_replace, text, flags=re.IGNORECASE)
+# Link the tenant's site anchors (url_mapping.py for the default school,
+# kb/<tenant>/url_mapping.json for others) as well as the url_box ones
+LINK_SITE_ANCHORS = os.getenv("LINK_SITE_ANCHORS", "1") == "1"
 
 # ──────────────────────────────
 # ✅  SET-UP
@@ -58,222 +57,153 @@ SIMILARITY_THRESHOLD      = 0.30
 RESPONSE_LIMIT            = 3
 STANDARD_MATCH_THRESHOLD  = 0.85
 
+embed_cache = EmbeddingCache()
+
 # ──────────────────────────────
-# 🔒  PII REDACTION
+# 🔒  PII REDACTION  (precompiled passes, see redaction.py)
 # ──────────────────────────────
-PII_PATTERNS = [
-    r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",                # emails
-    r"\b(?:\+44\s?7\d{3}|\(?07\d{3}\)?)\s?\d{3}\s?\d{3}\b",                # UK mobile
-    r"\b(?:\+44\s?1\d{3}|\(?01\d{3}\)?|\(?02\d{3}\)?)\s?\d{3}\s?\d{3,4}\b", # UK landline
-    r"\+?\d[\d\s\-().]{7,}\d",                                             # general int’l format
-    r"\b[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}\b",                               # UK postcode
-]
-
-def remove_personal_info(text: str) -> str:
-    # Basic PII redaction
-    for pat in PII_PATTERNS:
-        text = re.sub(pat, "[redacted]", text, flags=re.I)
-
-    # Remove intros like "My name is Mr Smith", "I'm Mrs Jones"
-    text = re.sub(
-        r"\b(my name is|i am|i’m|i’m called)\s+(mr\.?|mrs\.?|ms\.?|miss)?\s*[A-Z][a-z]+\b",
-        "my name is [redacted]",
-        text,
-        flags=re.I
-    )
-
-    # Remove "Dear Mr Carter", "Dear Ms Jones"
-    text = re.sub(
-        r"\bDear\s+(Mr\.?|Mrs\.?|Ms\.?|Miss)?\s*[A-Z][a-z]+\b",
-        "Dear [redacted]",
-        text,
-        flags=re.I
-    )
-
-    # Remove sign-offs like "Regards, John"
-    text = re.sub(
-        r"\b(?:regards|thanks|thank you|sincerely|best wishes|kind regards)[,]?\s+[A-Z][a-z]+\b",
-        "[redacted]",
-        text,
-        flags=re.I
-    )
-
-    return text
+from redaction import remove_personal_info
 
 # ──────────────────────────────
 # 📦  HELPERS
 # ──────────────────────────────
+def _embed_remote(texts: list) -> list:
+    res = client.embeddings.create(model=EMBED_MODEL, input=texts)
+    return [d.embedding for d in res.data]
+
+# concurrent cache misses are coalesced into one multi-input call
+# (EMBED_BATCH_WINDOW_MS / EMBED_BATCH_SIZE; window 0 disables batching)
+embed_batcher = EmbeddingBatcher(_embed_remote)
+
+def embed_texts(texts: list) -> list:
+    """Embed several texts, hitting the API only for ones not in the disk cache."""
+    return embed_with_cache(texts, EMBED_MODEL, embed_batcher.embed, embed_cache)
+
 def embed_text(text: str) -> np.ndarray:
-    text = text.replace("\n", " ")
-    res  = client.embeddings.create(model=EMBED_MODEL, input=[text])
-    return np.array(res.data[0].embedding)
-
-def markdown_to_html(text: str) -> str:
-    """Convert markdown links to clickable HTML (keeps anchor text)."""
-    return re.sub(
-        r'\[([^\]]+)\]\((https?://[^\)]+)\)',
-        lambda m: f'<a href="{m.group(2)}" target="_blank">{m.group(1)}</a>',
-        text
-    ) 
-
-def clean_gpt_email_output(md: str) -> str:
-    """Clean up GPT output to remove markdown/code block labels and subject lines."""
-    md = md.strip()
-    # Remove any triple backticks (and possible markdown label)
-    md = re.sub(r"^```(?:markdown)?", "", md, flags=re.I).strip()
-    md = re.sub(r"```$", "", md, flags=re.I).strip()
-    # Remove 'markdown:' or 'Subject:' at the very start
-    md = re.sub(r"^(markdown:|subject:)[\s]*", "", md, flags=re.I).strip()
-    # Remove accidental 'Subject:' anywhere at the very start of a line
-    md = re.sub(r"^Subject:.*\n?", "", md, flags=re.I)
-    return md.strip()
-
-def cosine_similarity(a, b):
-    """Return cosine similarity between two numpy arrays."""
-    a = np.array(a)
-    b = np.array(b)
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-
-   
+    return embed_texts([text])[0]
 
 # ──────────────────────────────
-# 📚  LOAD SCHOOL KB
+# 📚  SCHOOL KBs + TEMPLATES (per tenant, lazily, LRU under TENANT_MEMORY_MB)
 # ──────────────────────────────
-with open("embeddings/metadata.pkl", "rb") as f:
-    kb = pickle.load(f)
-    doc_embeddings = np.array(kb["embeddings"])
-    metadata = kb["metadata"]
+KB_DIR        = os.getenv("KB_DIR", "embeddings")          # default tenant; others live in kb/<tenant>/
+KB_PICKLE     = "embeddings/metadata.pkl"
+STANDARD_PATH = "standard_responses.json"
+
+def load_tenant(name: str) -> Tenant:
+    if name == DEFAULT_TENANT:
+        kb_dir, pickle_path, standard_path = KB_DIR, KB_PICKLE, STANDARD_PATH
+        prompt, anchors = None, site_anchors()          # REPLY_PROMPT_TEMPLATE + url_mapping.py
+    else:
+        base = tenant_dir(name)
+        kb_dir, pickle_path = base, None
+        standard_path = os.path.join(base, "standard_responses.json")
+        prompt, anchors = load_tenant_config(base)     # never Bassett House's
+    kb_index, lexical, chunks, kb_version = load_kb(kb_dir, pickle_path)
+    print(f"✅ Loaded {len(chunks)} KB chunks for '{name}'.")
+    templates = TemplateLibrary(standard_path).load(embed_texts, EMBED_MODEL, remove_personal_info)
+    return Tenant(name, kb_index, lexical, chunks, kb_version, templates, prompt,
+                  anchors if LINK_SITE_ANCHORS else {})
+
+tenants = TenantRegistry(load_tenant)
+
+def request_tenant(body: dict) -> Tenant:
+    """The tenant named in the body, or implied by the Host header (raises UnknownTenant)."""
+    return tenants.get(resolve_tenant(body, request.host))
+
+def check_standard_match(tenant: Tenant, q_vec: np.ndarray) -> str:
+    reply, score = tenant.templates.match(q_vec, STANDARD_MATCH_THRESHOLD)
+    if reply:
+        print(f"🔁 Using template (similarity {score:.2f})")
+    return reply
 
 # ──────────────────────────────
-# 📁  LOAD SAVED STANDARD RESPONSES
+# 🧩  /reply PIPELINE STEPS
 # ──────────────────────────────
-standard_messages, standard_embeddings, standard_replies = [], [], []
+FALLBACK_REPLY = "<p>Thank you for your enquiry. A member of our admissions team will contact you shortly.</p>"
+
+def read_reply_request(body: dict):
+    """Return (question, instruction, url_map) with PII removed."""
+    question_raw = (body.get("message") or "").strip()
+    url_box_text = (body.get("url_box") or "").strip()
+    url_map = parse_url_box(url_box_text)
+    instruction_raw = (body.get("instruction") or "").strip()
+
+    # 🔒 sanitise
+    question    = remove_personal_info(question_raw)
+    instruction = remove_personal_info(instruction_raw)
+    return question, instruction, url_map
+
+def template_response(matched) -> dict:
+    # If matched is a string, no URL is available
+    if isinstance(matched, str):
+        return {
+            "reply": matched,
+            "sentiment_score": 10,
+            "strategy_explanation": "Used approved template.",
+            "url": "",
+            "link_label": ""
+        }
+    # If matched is a dict with 'reply', 'url', and 'link_label'
+    return {
+        "reply": matched.get("reply", ""),
+        "sentiment_score": 10,
+        "strategy_explanation": "Used approved template.",
+        "url": matched.get("url", ""),
+        "link_label": matched.get("link_label", "")
+    }
+
+# SENTIMENT_MODE: "local" = nearest-centroid model over q_vec (default once
+# sentiment_model.npz exists), "llm" = gpt-4o-mini call, logged for training.
+sentiment_model = load_model()
+SENTIMENT_MODE  = os.getenv("SENTIMENT_MODE", "local" if sentiment_model else "llm")
+print(f"🧭 Sentiment mode: {SENTIMENT_MODE}")
+
+def analyse_sentiment(question: str, q_vec: np.ndarray):
+    """→ (score, strategy), locally from q_vec or via the LLM."""
+    if SENTIMENT_MODE == "local" and sentiment_model is not None:
+        return sentiment_model.predict(q_vec)
+    score, strat = analyse_sentiment_llm(question)
+    log_example(question, score, strat)
+    return score, strat
+
+def analyse_sentiment_llm(question: str):
+    """Sentiment (mini model, cheap) → (score, strategy)."""
+    sent_prompt = f"""
+    You are an expert school admissions assistant.
+
+    Please analyse the following parent enquiry and return a JSON object with two keys:
+
+    - "score": an integer from 1 (very negative) to 10 (very positive)
+    - "strategy": a maximum 30 words strategy for how to reply to the message
+
+    Only return the JSON object — no extra explanation.
+
+    Enquiry:
+    \"\"\"{question}\"\"\"
+    """.strip()
+
+    sent_json = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role":"user","content":sent_prompt}],
+        temperature=0.3
+    ).choices[0].message.content.strip()
 
-def _load_standard_library():
-    path="standard_responses.json"
-    if not os.path.exists(path):
-        print("⚠️ No standard_responses.json found.")
-        return
-    try:
-        with open(path,"r") as f:
-            saved=json.load(f)
-        for entry in saved:
-            msg = remove_personal_info(entry["message"])
-            rep = entry["reply"]                   # reply already HTML-ised
-            standard_messages.append(msg)
-            standard_embeddings.append(embed_text(msg))
-            standard_replies.append(rep)
-        print(f"✅ Loaded {len(standard_messages)} template replies.")
-    except Exception as e:
-        print(f"❌ Failed loading templates: {e}")
-
-_load_standard_library()
-
-def check_standard_match(q_vec: np.ndarray) -> str:
-    if not standard_embeddings: return ""
-    sims = [cosine_similarity(q_vec, emb) for emb in standard_embeddings]
-    best_idx = int(np.argmax(sims))
-    if sims[best_idx] >= STANDARD_MATCH_THRESHOLD:
-        print(f"🔁 Using template (similarity {sims[best_idx]:.2f})")
-        return standard_replies[best_idx]
-    return ""
-
-# ──────────────────────────────
-# 📨  POST /reply
-# ──────────────────────────────
-@app.route("/reply", methods=["POST"])
-def generate_reply():
     try:
-        body = request.get_json(force=True)
-        question_raw = (body.get("message") or "").strip()
-        url_box_text = (body.get("url_box") or "").strip()
-        url_map = parse_url_box(url_box_text)
-        instruction_raw = (body.get("instruction") or "").strip()
-
-        # 🔒 sanitise
-        question    = remove_personal_info(question_raw)
-        instruction = remove_personal_info(instruction_raw)
-
-        if not question:
-            return jsonify({"error":"No message received."}), 400
-
-        q_vec = embed_text(question)
-
-        # 1) pre-approved template?
-        matched = check_standard_match(q_vec)
-        if matched:
-            # If matched is a string, no URL is available
-            if isinstance(matched, str):
-                return jsonify({
-                    "reply": matched,
-                    "sentiment_score": 10,
-                    "strategy_explanation": "Used approved template.",
-                    "url": "",
-                    "link_label": ""
-                })
-            # If matched is a dict with 'reply', 'url', and 'link_label'
-            else:
-                return jsonify({
-                    "reply": matched.get("reply", ""),
-                    "sentiment_score": 10,
-                    "strategy_explanation": "Used approved template.",
-                    "url": matched.get("url", ""),
-                    "link_label": matched.get("link_label", "")
-                })
-
-
-        # 2) sentiment (mini model, cheap)
-        sent_prompt = f"""
-        You are an expert school admissions assistant.
-
-        Please analyse the following parent enquiry and return a JSON object with two keys:
-
-        - "score": an integer from 1 (very negative) to 10 (very positive)
-        - "strategy": a maximum 30 words strategy for how to reply to the message
-
-        Only return the JSON object — no extra explanation.
-
-        Enquiry:
-        \"\"\"{question}\"\"\"
-        """.strip()
-
-        sent_json = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role":"user","content":sent_prompt}],
-            temperature=0.3
-        ).choices[0].message.content.strip()
-
-        try:
-            sent = json.loads(sent_json)
-            score = int(sent.get("score",5))
-            strat = sent.get("strategy","")
-        except Exception:
-            score, strat = 5, ""
-            print("⚠️ Sentiment parse failed.")
-
-        # 3) KB retrieval
-        sims = [(cosine_similarity(q_vec, vec), meta) for vec, meta in zip(doc_embeddings, metadata)]
-        top = [m for m in sims if m[0] >= SIMILARITY_THRESHOLD]
-        top = sorted(top, key=lambda x:x[0], reverse=True)[:RESPONSE_LIMIT]
-
-        if not top:
-            return jsonify({
-                "reply":"<p>Thank you for your enquiry. A member of our admissions team will contact you shortly.</p>",
-                "sentiment_score":score,"strategy_explanation":strat
-            })
-
-        context_blocks = [f"{m['text']}\n[Info source]({m.get('url','')})" if m.get('url') else m['text']
-                          for _,m in top]
-        top_context = "\n---\n".join(context_blocks)
-
-        # 4) main reply prompt
-
-        from datetime import datetime
-
-        today_date = datetime.now().strftime('%d %B %Y')
-
-        prompt = f"""
+        sent = json.loads(sent_json)
+        score = int(sent.get("score",5))
+        strat = sent.get("strategy","")
+    except Exception:
+        score, strat = 5, ""
+        print("⚠️ Sentiment parse failed.")
+    return score, strat
+
+def retrieve_context(tenant: Tenant, q_vec: np.ndarray, question: str) -> list:
+    """Hybrid (vector + BM25) KB retrieval → [(score, chunk_meta), …] best first."""
+    scores, idxs = hybrid_search(tenant.kb_index, tenant.lexical, q_vec, question,
+                                 RESPONSE_LIMIT, SIMILARITY_THRESHOLD)
+    return [(float(s), tenant.chunks[i]) for s, i in zip(scores, idxs)]
+
+REPLY_PROMPT_TEMPLATE = """
 
 TODAY'S DATE IS {today_date}.
 
@@ -303,46 +233,204 @@ Sign off:
 Jess Ottley-Woodd  
 Director of Admissions  
 Bassett House School
-""".strip()
-
-        reply_md = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role":"user","content":prompt}],
-            temperature=0.4
-        ).choices[0].message.content.strip()
-        reply_md = clean_gpt_email_output(reply_md)
+"""
+
+# changes whenever the prompt wording changes – part of the reply-cache key
+def prompt_version(template: str) -> str:
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+PROMPT_VERSION = prompt_version(REPLY_PROMPT_TEMPLATE)
+
+def prompt_date() -> str:
+    return datetime.now().strftime('%d %B %Y')
+
+def build_reply_prompt(question: str, top: list, today_date: str, template: str = None) -> str:
+    context_blocks = [f"{m['text']}\n[Info source]({m.get('url','')})" if m.get('url') else m['text']
+                      for _,m in top]
+    top_context = "\n---\n".join(context_blocks)
+
+    return (template or REPLY_PROMPT_TEMPLATE).format(
+        today_date=today_date, question=question, top_context=top_context
+    ).strip()
+
+def generate_reply_md(question: str, top: list, today_date: str, template: str = None) -> str:
+    return client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role":"user","content":build_reply_prompt(question, top, today_date, template)}],
+        temperature=0.4
+    ).choices[0].message.content.strip()
+
+def finalise_reply(reply_md: str, url_map: dict, tenant: Tenant) -> dict:
+    """Clean, link and render the model's Markdown → {reply, url, link_label}."""
+    out = postprocess_reply(reply_md, url_map, tenant.site_anchors)
+    links = out["links"]
+    return {
+        "reply": out["reply"],
+        "url": links[0][1] if links else "",
+        "link_label": links[0][0] if links else ""
+    }
 
+# ──────────────────────────────
+# 🕸️  /reply STAGE GRAPH
+#
+#   q_vec ─► template ─► top ─► cache ─┬─► sentiment ─┐
+#      (Finish on a match)             │              ├─► response
+#      (Finish if no context)          └─► reply_md ──┘
+#      (Finish on a reply-cache hit)
+#
+# Sentiment and generation run concurrently; a template hit, an empty
+# retrieval or a cached reply finishes the run before either LLM call.
+# ──────────────────────────────
+STAGE_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("STAGE_POOL_SIZE", "32")),
+                                thread_name_prefix="reply-stage")
+
+reply_cache = ReplyCache()
+
+def reply_cache_key(tenant, question, instruction, url_map, top, today_date) -> str:
+    return make_key(
+        tenant=tenant.name,
+        question=question,
+        chunks=[hashlib.sha1(f"{m.get('url','')}\0{m['text']}".encode("utf-8")).hexdigest() for _, m in top],
+        url_map=url_map,
+        site_anchors=tenant.site_anchors,
+        instruction=instruction,
+        today_date=today_date,
+        kb_version=tenant.kb_version,
+        prompt_version=prompt_version(tenant.prompt_template) if tenant.prompt_template else PROMPT_VERSION,
+    )
 
-        # Format the reply
-        reply_md = insert_links(reply_md, url_map)
-        reply_html = markdown(reply_md)
+def front_stages(tenant: Tenant, question: str, instruction: str, url_map: dict, today_date: str) -> list:
+    """Stages shared by /reply and /reply-stream, up to the reply-cache lookup."""
+    def template_stage(q_vec):
+        matched = check_standard_match(tenant, q_vec)
+        return Finish(template_response(matched)) if matched else None
+
+    def retrieve_stage(q_vec, template):
+        return retrieve_context(tenant, q_vec, question) or Finish({"reply": FALLBACK_REPLY})
+
+    def cache_stage(top):
+        key = reply_cache_key(tenant, question, instruction, url_map, top, today_date)
+        cached = reply_cache.get(key)
+        if cached is not None:
+            metrics.incr("reply_cache.hit")
+            return Finish({**cached, "cached": True})
+        metrics.incr("reply_cache.miss")
+        return key
+
+    return [
+        Stage("q_vec",    lambda: embed_text(question)),
+        Stage("template", template_stage,  after=["q_vec"]),
+        Stage("top",      retrieve_stage,  after=["q_vec", "template"]),
+        Stage("cache",    cache_stage,     after=["top"]),
+    ]
+
+def store_reply(key: str, response: dict) -> dict:
+    reply_cache.put(key, response)
+    return {**response, "cached": False}
 
+# ──────────────────────────────
+# 📨  POST /reply
+# ──────────────────────────────
+@app.route("/reply", methods=["POST"])
+def generate_reply():
+    try:
+        body = request.get_json(force=True)
+        question, instruction, url_map = read_reply_request(body)
 
-        # ✅ Extract URLs from HTML
-        import re
+        if not question:
+            return jsonify({"error":"No message received."}), 400
+        tenant = request_tenant(body)
 
-        def extract_links_from_html(html):
-            matches = re.findall(r'<a[^>]+href="([^"]+)"[^>]*>(.*?)</a>', html)
-            return [(text.strip(), url.strip()) for url, text in matches]
+        metrics.incr("reply.requests")
+        today_date = prompt_date()
+        finished, out = run_stages(front_stages(tenant, question, instruction, url_map, today_date) + [
+            Stage("sentiment", lambda q_vec, cache: analyse_sentiment(question, q_vec),   after=["q_vec", "cache"]),
+            Stage("reply_md",  lambda top, cache: generate_reply_md(question, top, today_date, tenant.prompt_template),
+                  after=["top", "cache"]),
+        ], STAGE_POOL)
+        if finished:
+            return jsonify(out)
 
-        links = extract_links_from_html(reply_html)
-        matched_url = links[0][1] if links else ""
-        matched_source = links[0][0] if links else ""
+        score, strat = out["sentiment"]
 
         # ✅ Return enriched result
-        return jsonify({
-            "reply": reply_html,
+        return jsonify(store_reply(out["cache"], {
+            **finalise_reply(out["reply_md"], url_map, tenant),
             "sentiment_score": score,
-            "strategy_explanation": strat,
-            "url": matched_url,
-            "link_label": matched_source
-        })
+            "strategy_explanation": strat
+        }))
 
 
+    except UnknownTenant as e:
+        return jsonify({"error":f"Unknown school {e}."}), 404
     except Exception as e:
         print(f"❌ REPLY ERROR: {e}")
         return jsonify({"error":"Internal server error."}), 500
 
+# ──────────────────────────────
+# 📡  POST /reply-stream  (Server-Sent Events)
+# ──────────────────────────────
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/reply-stream", methods=["POST"])
+def generate_reply_stream():
+    """
+    Same pipeline as /reply, streamed as events:
+    `token`* (raw Markdown deltas) and `sentiment` (as soon as it is ready)
+    → `done` (final HTML), or `error`.
+    """
+    body = request.get_json(force=True)
+    question, instruction, url_map = read_reply_request(body)
+    if not question:
+        return jsonify({"error":"No message received."}), 400
+    try:
+        tenant = request_tenant(body)
+    except UnknownTenant as e:
+        return jsonify({"error":f"Unknown school {e}."}), 404
+
+    def events():
+        metrics.incr("reply.requests")
+        try:
+            today_date = prompt_date()
+            finished, out = run_stages(front_stages(tenant, question, instruction, url_map, today_date), STAGE_POOL)
+            if finished:
+                yield sse("done", out)
+                return
+
+            sentiment = STAGE_POOL.submit(analyse_sentiment, question, out["q_vec"])
+            sentiment_sent = False
+
+            stream = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role":"user","content":build_reply_prompt(question, out["top"], today_date, tenant.prompt_template)}],
+                temperature=0.4,
+                stream=True
+            )
+            parts = []
+            for chunk in stream:
+                if not sentiment_sent and sentiment.done():
+                    score, strat = sentiment.result()
+                    yield sse("sentiment", {"sentiment_score": score, "strategy_explanation": strat})
+                    sentiment_sent = True
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield sse("token", {"text": delta})
+
+            score, strat = sentiment.result()
+            yield sse("done", store_reply(out["cache"], {
+                **finalise_reply("".join(parts).strip(), url_map, tenant),
+                "sentiment_score": score,
+                "strategy_explanation": strat
+            }))
+        except Exception as e:
+            print(f"❌ REPLY STREAM ERROR: {e}")
+            yield sse("error", {"error": "Internal server error."})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ──────────────────────────────
 # ✏️  POST /revise
 # ──────────────────────────────
@@ -358,6 +446,7 @@ def revise():
 
         if not (message_raw and prev_reply):
             return jsonify({"error":"Missing fields."}), 400
+        tenant = request_tenant(body)
 
         message     = remove_personal_info(message_raw)
         instruction = remove_personal_info(instruction_raw)
@@ -382,13 +471,12 @@ Return only the revised reply in Markdown.
             messages=[{"role":"user","content":prompt}],
             temperature=0.4
         ).choices[0].message.content.strip()
-        new_md = clean_gpt_email_output(new_md)
-
-        # 🔗 Insert anchor links (if provided)
-        new_md_linked = insert_links(new_md, url_map)
 
-        return jsonify({"reply": markdown_to_html(new_md_linked)})
+        # 🧹 clean → 🔗 link → render, same as /reply
+        return jsonify({"reply": postprocess_reply(new_md, url_map, tenant.site_anchors)["reply"]})
 
+    except UnknownTenant as e:
+        return jsonify({"error":f"Unknown school {e}."}), 404
     except Exception as e:
         print(f"❌ REVISION ERROR: {e}")
         return jsonify({"error":"Revision failed."}), 500
@@ -408,25 +496,25 @@ def save_standard():
 
         msg_redacted = remove_personal_info(msg_raw)
 
-        # append & persist
-        record = {"timestamp":datetime.now().isoformat(),"message":msg_redacted,"reply":reply}
-        path="standard_responses.json"
-        data=[]
-        if os.path.exists(path):
-            with open(path,"r") as f: data=json.load(f)
-        data.append(record)
-        with open(path,"w") as f: json.dump(data,f,indent=2)
-
-        # in-memory
-        standard_messages.append(msg_redacted)
-        standard_embeddings.append(embed_text(msg_redacted))
-        standard_replies.append(reply)
+        # append & persist to this school's library (+ sidecar, in-memory index)
+        request_tenant(body).templates.add(msg_redacted, reply, datetime.now().isoformat(),
+                                           embed_text, EMBED_MODEL, remove_personal_info)
 
         return jsonify({"status":"ok"})
+    except UnknownTenant as e:
+        return jsonify({"status":"error","message":f"Unknown school {e}"}), 404
     except Exception as e:
         print(f"❌ SAVE ERROR: {e}")
         return jsonify({"status":"error","message":"Save failed"}),500
 
+# ──────────────────────────────
+# 📊  GET /metrics  (per worker)
+# ──────────────────────────────
+@app.route("/metrics")
+def get_metrics():
+    return jsonify({**metrics.snapshot(), "reply_cache.size": len(reply_cache),
+                    "tenants.resident": tenants.names(), "tenants.bytes": tenants.nbytes()})
+
 # ──────────────────────────────
 # 🌐  SERVE FRONT END
 # ──────────────────────────────
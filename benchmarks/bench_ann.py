@@ -0,0 +1,67 @@
+"""
+Recall/latency benchmark for the IVF index against exact search.
+
+    python benchmarks/bench_ann.py --rows 200000 --nprobe 4,8,16,32,64
+
+Synthetic KB: rows drawn around `--topics` random topic directions (as
+chunks from many school sites cluster by subject), queries are noisy
+copies of random rows. Reports recall@3 (overlap of the IVF top 3 with
+the exact top 3) and per-query latency for each nprobe.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from retrieval import VectorIndex, normalise_rows
+from ann import IVFIndex, default_nlist
+
+
+def make_kb(rows, dim, topics, spread, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim), dtype=np.float32)
+    kb = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 20000):
+        n = min(20000, rows - start)
+        kb[start:start + n] = centres[rng.integers(0, topics, n)] + spread * rng.standard_normal((n, dim), dtype=np.float32)
+    return normalise_rows(kb), rng
+
+
+def timed(index, queries, **kw):
+    results, t0 = [], time.perf_counter()
+    for q in queries:
+        results.append(index.search(q, 3, **kw)[1])
+    return results, (time.perf_counter() - t0) / len(queries) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--topics", type=int, default=2000)
+    ap.add_argument("--spread", type=float, default=1.5, help="row noise around its topic (higher = harder)")
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--nlist", type=int, default=0, help="default 2·sqrt(rows)")
+    ap.add_argument("--nprobe", default="4,8,16,32,64")
+    args = ap.parse_args()
+
+    kb, rng = make_kb(args.rows, args.dim, args.topics, args.spread)
+    picks = rng.integers(0, args.rows, args.queries)
+    queries = kb[picks] + 0.8 * rng.standard_normal((args.queries, args.dim), dtype=np.float32) / np.sqrt(args.dim)
+
+    t0 = time.perf_counter()
+    ivf = IVFIndex.build(kb, args.nlist or default_nlist(args.rows))
+    print(f"{args.rows} rows × {args.dim}, nlist {ivf.nlist}: IVF built in {time.perf_counter() - t0:.1f}s\n")
+
+    exact, exact_ms = timed(VectorIndex(kb, normalised=True), queries)
+    print(f"{'exact':>12}: {exact_ms:7.2f} ms/query  recall@3 1.000")
+    for nprobe in (int(x) for x in args.nprobe.split(",")):
+        approx, ms = timed(ivf, queries, nprobe=nprobe)
+        recall = np.mean([len(set(a) & set(e)) / 3 for a, e in zip(approx, exact)])
+        print(f"{f'nprobe {nprobe}':>12}: {ms:7.2f} ms/query  recall@3 {recall:.3f}  {exact_ms / ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Offline benchmark for index-build embedding.
+
+    python benchmarks/bench_bulk_embed.py --chunks 3000 --concurrency 1,4,8 --server-limit 6
+
+Starts a local OpenAI-compatible embeddings server and embeds synthetic
+KB chunks through the real OpenAI client, first the old way (fixed
+100-item batches, one request at a time) and then through BulkEmbedder at
+each concurrency. With --server-limit below the concurrency, some
+requests get 429s and exercise the retry path. Every run checks that the
+vectors come back in input order.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+import openai
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bulk_embed import BulkEmbedder
+from benchmarks.stand_ins import EmbeddingsServer, fake_vector
+
+WORDS = "pupils boarding fees admissions scholarship sixth form open morning bursary sport music".split()
+
+
+def make_chunks(n, seed=0):
+    rng = random.Random(seed)
+    return [f"chunk {i}: " + " ".join(rng.choices(WORDS, k=rng.randint(30, 400))) for i in range(n)]
+
+
+def check_order(texts, vectors):
+    for i in range(0, len(texts), max(1, len(texts) // 50)):
+        assert np.allclose(vectors[i], fake_vector(texts[i]), atol=1e-6), f"vector {i} out of order"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=3000)
+    ap.add_argument("--concurrency", default="1,4,8")
+    ap.add_argument("--batch-tokens", type=int, default=50000)
+    ap.add_argument("--base-ms", type=float, default=150)
+    ap.add_argument("--per-token-ms", type=float, default=0.002)
+    ap.add_argument("--server-limit", type=int, default=6, help="requests in flight before 429s (0 = none)")
+    args = ap.parse_args()
+
+    server = EmbeddingsServer(base_ms=args.base_ms, per_token_ms=args.per_token_ms,
+                              max_concurrent=args.server_limit).start()
+    client = openai.OpenAI(api_key="stand-in", base_url=server.base_url, max_retries=0)
+    texts = make_chunks(args.chunks)
+
+    def create(batch):
+        response = client.embeddings.create(input=batch, model="text-embedding-3-small")
+        return [e.embedding for e in sorted(response.data, key=lambda e: e.index)]
+
+    print(f"{len(texts)} chunks, server {args.base_ms:.0f}ms + {args.per_token_ms}ms/token, "
+          f"limit {args.server_limit or 'none'}\n")
+
+    t0 = time.perf_counter()
+    vectors = [v for i in range(0, len(texts), 100) for v in create(texts[i:i + 100])]
+    baseline = time.perf_counter() - t0
+    check_order(texts, vectors)
+    print(f"{'fixed 100, sequential':>28}: {baseline:6.2f}s  {len(texts) / baseline:7.0f} texts/s\n")
+
+    for c in (int(x) for x in args.concurrency.split(",")):
+        server.requests = server.rejected = 0
+        embedder = BulkEmbedder(create, max_tokens=args.batch_tokens, concurrency=c, backoff=0.2, report_every=1e9)
+        t0 = time.perf_counter()
+        vectors = embedder(texts)
+        wall = time.perf_counter() - t0
+        check_order(texts, vectors)
+        print(f"{f'token batches, concurrency {c}':>28}: {wall:6.2f}s  {len(texts) / wall:7.0f} texts/s  "
+              f"{baseline / wall:5.1f}x  ({embedder.requests} requests, {server.rejected} rate-limited)\n")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
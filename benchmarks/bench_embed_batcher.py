@@ -0,0 +1,56 @@
+"""
+Offline benchmark for the embedding micro-batcher.
+
+    python benchmarks/bench_embed_batcher.py --clients 32 --windows 0,2,5,10,25
+
+Each client thread embeds one query at a time (like a /reply worker
+thread). Reports API calls, throughput and per-query latency for each
+batch window; window 0 is the unbatched baseline.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embed_batcher import EmbeddingBatcher
+from benchmarks.stand_ins import LocalEmbeddingsClient
+
+
+def run(window_ms, clients, per_client, max_batch, base_ms, api_concurrency):
+    api = LocalEmbeddingsClient(base_ms=base_ms, max_concurrent=api_concurrency)
+    batcher = EmbeddingBatcher(api.create, window_ms=window_ms, max_batch=max_batch)
+    latencies, lock = [], threading.Lock()
+
+    def worker(cid):
+        for i in range(per_client):
+            t0 = time.perf_counter()
+            batcher.embed([f"enquiry {cid}-{i}"])
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(c,)) for c in range(clients)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    wall = time.perf_counter() - t0
+
+    lat = np.array(latencies) * 1000
+    print(f"window={window_ms:>5.1f}ms  api_calls={api.calls:>4}  "
+          f"throughput={len(lat) / wall:>7.1f} q/s  "
+          f"p50={np.percentile(lat, 50):>6.1f}ms  p95={np.percentile(lat, 95):>6.1f}ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--per-client", type=int, default=5)
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--base-ms", type=float, default=120, help="simulated API round trip")
+    ap.add_argument("--api-concurrency", type=int, default=8, help="simulated in-flight request limit (0 = unlimited)")
+    ap.add_argument("--windows", default="0,2,5,10,25")
+    args = ap.parse_args()
+    for w in (float(x) for x in args.windows.split(",")):
+        run(w, args.clients, args.per_client, args.max_batch, args.base_ms, args.api_concurrency)
@@ -0,0 +1,87 @@
+"""
+Per-reply CPU time of the post-processing pipeline.
+
+    python benchmarks/bench_postprocess.py --replies 2000 --anchors 10 200
+
+Compares the old chain (four cleanup regexes → per-call regex linker →
+markdown.markdown() → <a> regex over the HTML) with postprocess_reply(),
+for url_box maps of the given sizes. "site" rows also link the
+URL_MAPPING / URL_ALIASES anchors, which the old chain never did.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import markdown
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from postprocess import postprocess_reply
+from linker import site_anchors
+
+REPLY = """```markdown
+Dear Mrs Patel,
+
+Thank you for your enquiry about a Reception place for your daughter in September. We would be delighted
+to welcome you to Bassett House School. The best way to get to know us is to visit: you can book an
+individual tour through our [Visit Us](https://www.bassetths.org.uk/visit-us/) page, and families looking
+at Nursery or Reception are warmly invited to Attend a Stay & Play.
+
+Our Admissions Journey explains each step, from registration to offer, and our Fees page sets out the
+current fee structure. If you would like to talk through the Year Of Entry Calculator or our Clubs and
+Co-Curricular programme, I would be happy to arrange a call.
+
+With warm regards,
+
+Jess Ottley-Woodd
+Director of Admissions
+Bassett House School
+```"""
+
+
+def legacy_postprocess(reply_md, url_map):
+    md = reply_md.strip()
+    md = re.sub(r"^```(?:markdown)?", "", md, flags=re.I).strip()
+    md = re.sub(r"```$", "", md, flags=re.I).strip()
+    md = re.sub(r"^(markdown:|subject:)[\s]*", "", md, flags=re.I).strip()
+    md = re.sub(r"^Subject:.*\n?", "", md, flags=re.I).strip()
+
+    def safe_replace(match):
+        word = match.group(0)
+        for anchor, url in url_map.items():
+            if word.lower() == anchor.lower():
+                return f"[{word}]({url})"
+        return word
+    sorted_anchors = sorted(url_map.keys(), key=len, reverse=True)
+    pattern = r'\b(' + '|'.join(re.escape(a) for a in sorted_anchors) + r')\b'
+    md = re.sub(pattern, safe_replace, md, flags=re.IGNORECASE)
+
+    html = markdown.markdown(md)
+    links = [(t.strip(), u.strip()) for u, t in re.findall(r'<a[^>]+href="([^"]+)"[^>]*>(.*?)</a>', html)]
+    return html, links
+
+
+def cpu_per_reply(fn, n):
+    fn()                                          # warm caches (compiled automaton, parser)
+    t0 = time.process_time()
+    for _ in range(n):
+        fn()
+    return (time.process_time() - t0) / n * 1e6
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--replies", type=int, default=2000)
+    ap.add_argument("--anchors", type=int, nargs="+", default=[10, 200])
+    args = ap.parse_args()
+
+    for n_anchors in args.anchors:
+        url_map = {"Fees": "https://www.bassetths.org.uk/admissions/fees/",
+                   "Admissions Journey": "https://www.bassetths.org.uk/admissions/how-to-join/"}
+        url_map.update({f"Anchor Phrase {i}": f"https://example.org/{i}" for i in range(n_anchors - len(url_map))})
+
+        old = cpu_per_reply(lambda: legacy_postprocess(REPLY, url_map), args.replies)
+        new = cpu_per_reply(lambda: postprocess_reply(REPLY, url_map), args.replies)
+        site = cpu_per_reply(lambda: postprocess_reply(REPLY, url_map, site_anchors()), args.replies)
+        print(f"{n_anchors:>4} url_box anchors  legacy={old:>7.0f}µs  unified={new:>7.0f}µs  "
+              f"unified+site={site:>7.0f}µs  speed-up={old / new:>4.1f}x")
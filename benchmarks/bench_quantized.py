@@ -0,0 +1,71 @@
+"""
+Memory / top-3 agreement / latency of quantized KB storage vs exact float32.
+
+    python benchmarks/bench_quantized.py --rows 50000 --rerank 0,64
+    python benchmarks/bench_quantized.py --kb embeddings      # a real index
+
+Synthetic rows come from bench_ann.make_kb; with --kb, queries are noisy
+copies of the index's own rows. "top-3 same" is the share of queries whose
+top 3 (in order) matches exact search; recall@3 ignores order.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from retrieval import VectorIndex, normalise_rows
+from quantized import Int8Index, PQIndex
+from kb_index import load_index
+from bench_ann import make_kb, timed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--topics", type=int, default=1000)
+    ap.add_argument("--spread", type=float, default=1.5)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--kb", default="", help="benchmark an on-disk index instead of synthetic rows")
+    ap.add_argument("--rerank", default="0,64", help="exact re-rank shortlist sizes to try")
+    ap.add_argument("--no-pq", action="store_true")
+    args = ap.parse_args()
+
+    if args.kb:
+        index, _, _ = load_index(args.kb, quantization="none", two_stage=False)
+        kb = normalise_rows(index.matrix)
+        rng = np.random.default_rng(0)
+    else:
+        kb, rng = make_kb(args.rows, args.dim, args.topics, args.spread)
+    rows, dim = kb.shape
+    picks = rng.integers(0, rows, args.queries)
+    queries = kb[picks] + 0.8 * rng.standard_normal((args.queries, dim), dtype=np.float32) / np.sqrt(dim)
+
+    exact_index = VectorIndex(kb, normalised=True)
+    exact, exact_ms = timed(exact_index, queries)
+    print(f"{rows} rows × {dim}\n")
+    print(f"{'':>14}  {'MB':>8}  {'×smaller':>8}  {'ms/query':>8}  {'top-3 same':>10}  {'recall@3':>8}")
+    print(f"{'float64':>14}  {kb.nbytes * 2 / 1e6:8.1f}")
+    print(f"{'float32':>14}  {exact_index.nbytes / 1e6:8.1f}  {1:8.1f}  {exact_ms:8.2f}  {1:10.3f}  {1:8.3f}")
+
+    t0 = time.perf_counter()
+    built = [("int8", Int8Index.build(kb, exact=kb))]
+    if not args.no_pq and dim % 96 == 0:
+        built.append(("pq", PQIndex.build(kb, exact=kb)))
+    print(f"{'(build)':>14}  {time.perf_counter() - t0:.1f}s")
+
+    for name, index in built:
+        for rerank in (int(x) for x in args.rerank.split(",")):
+            index.rerank = rerank
+            approx, ms = timed(index, queries)
+            same = np.mean([list(a) == list(e) for a, e in zip(approx, exact)])
+            recall = np.mean([len(set(a) & set(e)) / 3 for a, e in zip(approx, exact)])
+            label = f"{name} +rr{rerank}" if rerank else name
+            print(f"{label:>14}  {index.nbytes / 1e6:8.1f}  {exact_index.nbytes / index.nbytes:8.1f}  "
+                  f"{ms:8.2f}  {same:10.3f}  {recall:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Latency/recall of two-stage (prefix shortlist → full re-score) search as the KB grows.
+
+    python benchmarks/bench_two_stage.py --rows 10000,50000,200000 --shortlist 50,100,200
+    python benchmarks/bench_two_stage.py --kb embeddings      # a real index
+
+Synthetic rows come from bench_ann.make_kb. Their noise is spread evenly
+over all dims, so a 256-dim prefix keeps less of each row than it does for
+real text-embedding-3 vectors: recall here is a pessimistic estimate.
+"""
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from retrieval import VectorIndex, normalise_rows
+from two_stage import TwoStageIndex
+from kb_index import load_index
+from bench_ann import make_kb, timed
+
+
+def report(kb, rng, args):
+    rows, dim = kb.shape
+    picks = rng.integers(0, rows, args.queries)
+    queries = kb[picks] + 0.8 * rng.standard_normal((args.queries, dim), dtype=np.float32) / np.sqrt(dim)
+
+    exact, exact_ms = timed(VectorIndex(kb, normalised=True), queries)
+    print(f"{rows} rows × {dim}: exact {exact_ms:.2f} ms/query")
+    for prefix_dim in (int(x) for x in args.prefix.split(",")):
+        index = TwoStageIndex(kb, prefix_dim=prefix_dim)
+        for shortlist in (int(x) for x in args.shortlist.split(",")):
+            approx, ms = timed(index, queries, shortlist=shortlist)
+            recall = np.mean([len(set(a) & set(e)) / 3 for a, e in zip(approx, exact)])
+            print(f"  prefix {prefix_dim:4d} shortlist {shortlist:4d}: {ms:7.2f} ms/query  "
+                  f"recall@3 {recall:.3f}  {exact_ms / ms:5.1f}x")
+    print()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="10000,50000,200000")
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--topics", type=int, default=2000)
+    ap.add_argument("--spread", type=float, default=1.5)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--prefix", default="256")
+    ap.add_argument("--shortlist", default="50,100,200")
+    ap.add_argument("--kb", default="", help="benchmark an on-disk index instead of synthetic rows")
+    args = ap.parse_args()
+
+    if args.kb:
+        index, _, _ = load_index(args.kb, quantization="none", two_stage=False)
+        report(normalise_rows(index.matrix), np.random.default_rng(0), args)
+        return
+    for rows in (int(x) for x in args.rows.split(",")):
+        kb, rng = make_kb(rows, args.dim, args.topics, args.spread)
+        report(kb, rng, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# ─── LOCAL STAND-INS FOR THE OPENAI API ─────────────────────
+#
+# Deterministic, offline replacements used by the benchmarks in this folder.
+#
+import json
+import time
+import base64
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+
+def fake_vector(text: str, dim: int = 1536) -> list:
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32).tolist()
+
+
+class LocalEmbeddingsClient:
+    """
+    Mimics `client.embeddings.create(input=[...])` latency: a fixed
+    round-trip cost plus a small per-input cost. `max_concurrent` models a
+    connection pool / rate limit: extra calls queue behind it.
+    """
+
+    def __init__(self, base_ms: float = 120, per_item_ms: float = 0.5, dim: int = 1536, max_concurrent: int = 0):
+        self.base = base_ms / 1000.0
+        self.per_item = per_item_ms / 1000.0
+        self.dim = dim
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+    def create(self, texts: list) -> list:
+        with self._lock:
+            self.calls += 1
+        if self._slots:
+            with self._slots:
+                time.sleep(self.base + self.per_item * len(texts))
+        else:
+            time.sleep(self.base + self.per_item * len(texts))
+        return [fake_vector(t, self.dim) for t in texts]
+
+
+class EmbeddingsServer(ThreadingHTTPServer):
+    """
+    OpenAI-compatible POST /v1/embeddings on localhost, so real client code
+    can be pointed at it with `base_url`. Latency is a fixed round trip
+    plus a per-token cost; more than `max_concurrent` requests in flight
+    get 429 Too Many Requests, like a rate-limited account.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, base_ms: float = 120, per_token_ms: float = 0.002,
+                 max_concurrent: int = 0, dim: int = 1536):
+        super().__init__(("127.0.0.1", port), _EmbeddingsHandler)
+        self.base = base_ms / 1000.0
+        self.per_token = per_token_ms / 1000.0
+        self.max_concurrent = max_concurrent
+        self.dim = dim
+        self.inflight = 0
+        self.requests = self.rejected = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _EmbeddingsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        with srv.lock:
+            srv.requests += 1
+            if srv.max_concurrent and srv.inflight >= srv.max_concurrent:
+                srv.rejected += 1
+                busy = True
+            else:
+                srv.inflight += 1
+                busy = False
+        if busy:
+            return self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                               headers=[("Retry-After", "0.2")])
+        try:
+            tokens = sum(len(t) // 4 + 1 for t in texts)
+            time.sleep(srv.base + srv.per_token * tokens)
+            data = []
+            for i, t in enumerate(texts):
+                vec = fake_vector(t, srv.dim)
+                if body.get("encoding_format") == "base64":
+                    vec = base64.b64encode(np.asarray(vec, dtype="<f4").tobytes()).decode("ascii")
+                data.append({"object": "embedding", "index": i, "embedding": vec})
+            self._reply(200, {"object": "list", "data": data, "model": body.get("model", ""),
+                              "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+        finally:
+            with srv.lock:
+                srv.inflight -= 1
@@ -0,0 +1,279 @@
+# ─── KB BUILD PIPELINE ──────────────────────────────────────
+#
+#   python build_kb.py                                   # default school
+#   python build_kb.py --site bassett=https://www.bassetths.org.uk --site other=https://…
+#   python build_kb.py --offline                         # keep crawled pages, rebuild the rest
+#   python build_kb.py --resume                          # carry on after an interrupted crawl
+#
+# Per school: scrape → chunk → embed → index, declared as Stages and run
+# with pipeline.run_stages, so different schools build in parallel.
+# Work files live in build/<school>/; the result is one index, validated
+# before it replaces kb/<school>/ (point the app's KB_DIR at it).
+#
+# Every stage after scrape is keyed by a hash of its inputs (upstream
+# output hashes + settings) and skipped when the key and its outputs are
+# unchanged. Scrape always runs, but re-crawls with conditional requests;
+# pages are streamed to JSONL and hashed independently of crawl order, so
+# an unchanged site reruns nothing downstream.
+#
+import os
+import json
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+
+from pipeline import Stage, run_stages
+from crawler import Crawler
+from crawl_state import CrawlState
+from chunker import CHUNK_TOKENS, OVERLAP_TOKENS, TOKENIZER, chunk_pages
+from embed_cache import EmbeddingCache, embed_with_cache
+from bulk_embed import BulkEmbedder
+from kb_index import index_files, save_index
+from page_store import JsonlWriter, iter_jsonl, jsonl_digest
+
+BUILD_DIR   = "build"
+KB_ROOT     = "kb"
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_DIM   = 1536
+CHUNKER_VERSION = 2        # bump when chunker output changes for the same settings
+CACHE_CHECKPOINT = 2000    # texts embedded between embedding-cache writes
+DEFAULT_SITES = {"bassett": ["https://www.bassetths.org.uk"]}
+
+
+def _key(**parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _digest_files(paths) -> str:
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def _write_json(path, obj):
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ─── STAGE CACHE ────────────────────────────────────────────
+class StageCache:
+    """Records {stage: {key, output}} per school so unchanged stages are skipped."""
+
+    def __init__(self, directory: str, label: str, force: bool = False):
+        self.path = os.path.join(directory, "stages.json")
+        self.label = label
+        self.force = force
+        self._lock = threading.Lock()
+        self.records = json.load(open(self.path, encoding="utf-8")) if os.path.exists(self.path) else {}
+
+    def run(self, stage: str, key: str, outputs, fn) -> str:
+        """Run `fn()` unless `key` matches the last run and `outputs()` still hash the same."""
+        rec = self.records.get(stage)
+        if rec and rec["key"] == key and not self.force:
+            try:
+                if _digest_files(outputs()) == rec["output"]:
+                    print(f"⏭️ [{self.label}] {stage}: unchanged, skipped")
+                    return rec["output"]
+            except FileNotFoundError:
+                pass
+        fn()
+        output = _digest_files(outputs())
+        with self._lock:
+            self.records[stage] = {"key": key, "output": output}
+            _write_json(self.path, self.records)
+        return output
+
+
+# ─── EMBEDDING ──────────────────────────────────────────────
+_client = None
+
+
+def openai_create(batch: list) -> list:
+    """One embeddings request; retries are left to BulkEmbedder."""
+    global _client
+    if _client is None:
+        import openai
+        _client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    response = _client.embeddings.create(input=batch, model=EMBED_MODEL)
+    return [e.embedding for e in sorted(response.data, key=lambda e: e.index)]
+
+
+def embed_chunks(texts: list, model: str, create, previous: dict = None, label: str = "") -> np.ndarray:
+    """
+    Vectors for `texts`, reusing `previous` ({text hash: vector}, same model)
+    and embedding each remaining distinct text once.
+    """
+    previous = previous or {}
+    keys = [text_key(t) for t in texts]
+    missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in previous))
+    dropped = len(set(previous) - set(keys))
+    print(f"🔍 {label}{len(texts)} chunks: {len(texts) - sum(k not in previous for k in keys)} reused, "
+          f"{len(missing)} to embed, {dropped} dropped from the previous build.")
+
+    fresh = {}
+    if missing:
+        vectors = embed_with_cache(missing, model, BulkEmbedder(create), EmbeddingCache(), batch_size=CACHE_CHECKPOINT)
+        fresh = dict(zip((text_key(t) for t in missing), vectors))
+    return np.array([previous[k] if k in previous else fresh[k] for k in keys], dtype=np.float32).reshape(len(keys), -1)
+
+
+# ─── VALIDATION ─────────────────────────────────────────────
+def validate_kb(vectors, chunks: list, directory: str, dim: int = EMBED_DIM) -> None:
+    """
+    Check vectors + chunks make an index the app can serve; raises ValueError.
+    Runs before save_index, so a bad build never replaces the live index.
+    """
+    problems = []
+    if vectors.ndim != 2 or vectors.shape[1] != dim:
+        problems.append(f"vectors shaped {vectors.shape}, expected (n, {dim})")
+    if len(vectors) != len(chunks):
+        problems.append(f"{len(vectors)} vectors but {len(chunks)} chunks")
+    if not chunks:
+        problems.append("no chunks")
+    if any(not c.get("text") or not c.get("url") for c in chunks):
+        problems.append("chunk without text or url")
+    norms = np.linalg.norm(vectors, axis=1) if vectors.ndim == 2 else np.ones(0)
+    if not np.all(np.isfinite(norms)) or np.any(norms == 0):
+        problems.append("vectors not finite / all zero")
+    if problems:
+        raise ValueError(f"{directory}: invalid index: " + "; ".join(problems))
+
+
+# ─── PER-SCHOOL STAGES ──────────────────────────────────────
+class SchoolBuild:
+    def __init__(self, name: str, seeds: list, args, create=openai_create):
+        self.name = name
+        self.seeds = seeds
+        self.args = args
+        self.create = create
+        self.work = os.path.join(args.build_dir, name)
+        self.index_dir = os.path.join(args.kb_root, name)
+        os.makedirs(self.work, exist_ok=True)
+        self.cache = StageCache(self.work, name, force=args.force)
+        self.pages_path = os.path.join(self.work, "pages.jsonl")
+        self.chunks_path = os.path.join(self.work, "chunks.jsonl")
+        self.vectors_path = os.path.join(self.work, "vectors.npy")
+        self.keys_path = os.path.join(self.work, "vector_keys.json")
+
+    def stage(self, step: str) -> str:
+        return f"{self.name}.{step}"
+
+    def stages(self) -> list:
+        return [
+            Stage(self.stage("scrape"), self.scrape),
+            Stage(self.stage("chunk"), self.chunk, after=[self.stage("scrape")]),
+            Stage(self.stage("embed"), self.embed, after=[self.stage("chunk")]),
+            Stage(self.stage("index"), self.index, after=[self.stage("chunk"), self.stage("embed")]),
+        ]
+
+    def scrape(self) -> str:
+        if self.args.offline and os.path.exists(self.pages_path):
+            print(f"⏭️ [{self.name}] scrape: offline, using {self.pages_path}")
+            return jsonl_digest(self.pages_path)
+        state = CrawlState(os.path.join(self.work, "crawl_state.sqlite"))
+        try:
+            crawler = Crawler(self.seeds, max_depth=self.args.max_depth, workers=self.args.workers,
+                              per_host=self.args.per_host, delay=self.args.delay, state=state,
+                              resume=self.args.resume)
+            with JsonlWriter(self.pages_path) as out:
+                for page in crawler.crawl():
+                    out.write(page)
+        finally:
+            state.close()
+        if not out.count:
+            raise RuntimeError(f"[{self.name}] crawl of {self.seeds} returned no pages")
+        print(f"✅ [{self.name}] scrape: {out.count} pages (" +
+              ", ".join(f"{len(v)} {k}" for k, v in crawler.changes.items()) + ")")
+        return jsonl_digest(self.pages_path)
+
+    def chunk(self, **up) -> str:
+        key = _key(pages=up[self.stage("scrape")], tokens=CHUNK_TOKENS, overlap=OVERLAP_TOKENS,
+                   tokenizer=TOKENIZER, version=CHUNKER_VERSION)
+
+        def run():
+            with JsonlWriter(self.chunks_path) as out:
+                for chunk in chunk_pages(iter_jsonl(self.pages_path), CHUNK_TOKENS, OVERLAP_TOKENS):
+                    out.write(chunk)
+            print(f"✅ [{self.name}] chunk: {out.count} chunks")
+
+        return self.cache.run("chunk", key, lambda: [self.chunks_path], run)
+
+    def embed(self, **up) -> str:
+        key = _key(chunks=up[self.stage("chunk")], model=EMBED_MODEL)
+
+        def run():
+            previous = {}
+            if os.path.exists(self.keys_path) and os.path.exists(self.vectors_path):
+                with open(self.keys_path, encoding="utf-8") as f:
+                    prev = json.load(f)
+                if prev["model"] == EMBED_MODEL:
+                    previous = dict(zip(prev["keys"], np.load(self.vectors_path)))
+            texts = [c["text"] for c in iter_jsonl(self.chunks_path)]
+            vectors = embed_chunks(texts, EMBED_MODEL, self.create, previous, label=f"[{self.name}] ")
+            np.save(f"{self.vectors_path}.tmp.npy", vectors)
+            os.replace(f"{self.vectors_path}.tmp.npy", self.vectors_path)
+            _write_json(self.keys_path, {"model": EMBED_MODEL, "keys": [text_key(t) for t in texts]})
+
+        return self.cache.run("embed", key, lambda: [self.vectors_path, self.keys_path], run)
+
+    def index(self, **up) -> str:
+        key = _key(chunks=up[self.stage("chunk")], vectors=up[self.stage("embed")])
+
+        def run():
+            chunks = list(iter_jsonl(self.chunks_path))
+            vectors = np.load(self.vectors_path)
+            validate_kb(vectors, chunks, self.index_dir)
+            save_index(self.index_dir, vectors, chunks, model=EMBED_MODEL)
+            print(f"✅ [{self.name}] index: {len(chunks)} chunks → {self.index_dir}")
+
+        return self.cache.run("index", key, lambda: index_files(self.index_dir), run)
+
+
+def parse_sites(values) -> dict:
+    sites = {}
+    for value in values or []:
+        name, sep, url = value.partition("=")
+        if not sep or not name or not url:
+            raise SystemExit(f"--site expects name=url, got {value!r}")
+        sites.setdefault(name, []).append(url)
+    return sites or DEFAULT_SITES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the KB index for one or more schools")
+    parser.add_argument("--site", action="append", metavar="NAME=URL",
+                        help="school name and start URL; repeat for several schools or seeds")
+    parser.add_argument("--offline", action="store_true", help="don't crawl if pages were already scraped")
+    parser.add_argument("--resume", action="store_true", help="continue interrupted crawls from their frontier")
+    parser.add_argument("--force", action="store_true", help="ignore stage caches and rebuild everything")
+    parser.add_argument("--jobs", type=int, default=4, help="stages run in parallel across schools")
+    parser.add_argument("--build-dir", default=BUILD_DIR)
+    parser.add_argument("--kb-root", default=KB_ROOT)
+    parser.add_argument("--max-depth", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=8, help="pages fetched in parallel per school")
+    parser.add_argument("--per-host", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    builds = [SchoolBuild(name, seeds, args) for name, seeds in parse_sites(args.site).items()]
+    with ThreadPoolExecutor(args.jobs, thread_name_prefix="build") as pool:
+        run_stages([s for b in builds for s in b.stages()], pool)
+    for b in builds:
+        print(f"✅ {b.name}: KB_DIR={b.index_dir}")
+
+
+if __name__ == "__main__":
+    main()
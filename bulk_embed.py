@@ -0,0 +1,122 @@
+# ─── BULK EMBEDDING FOR INDEX BUILDS ────────────────────────
+#
+# Packs texts into requests by estimated token count (not a fixed item
+# count), keeps up to `concurrency` requests in flight, and retries
+# rate-limited / transient failures with exponential backoff + jitter.
+# Vectors always come back in input order.
+#
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BULK_EMBED_BATCH_TOKENS = int(os.getenv("BULK_EMBED_BATCH_TOKENS", "50000"))
+BULK_EMBED_BATCH_ITEMS  = int(os.getenv("BULK_EMBED_BATCH_ITEMS", "512"))    # API hard limit is 2048
+BULK_EMBED_CONCURRENCY  = int(os.getenv("BULK_EMBED_CONCURRENCY", "4"))
+BULK_EMBED_RETRIES      = int(os.getenv("BULK_EMBED_RETRIES", "6"))
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token for English prose; close enough for batch sizing."""
+    return len(text) // 4 + 1
+
+
+def token_batches(texts: list, max_tokens: int, max_items: int) -> list:
+    """Split range(len(texts)) into consecutive index slices under both limits."""
+    batches, start, tokens = [], 0, 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if i > start and (tokens + cost > max_tokens or i - start >= max_items):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += cost
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def is_retryable(exc: Exception) -> bool:
+    """429s, 5xx and connection/timeouts are worth retrying; bad requests are not."""
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = type(exc).__name__
+    return isinstance(exc, (ConnectionError, TimeoutError)) or name in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(exc: Exception):
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class BulkEmbedder:
+    """
+    `BulkEmbedder(create)(texts)` → vectors, where `create(batch) -> list[vector]`
+    is one API request. Counters accumulate across calls so one progress line
+    covers a whole build.
+    """
+
+    def __init__(self, create, max_tokens: int = BULK_EMBED_BATCH_TOKENS, max_items: int = BULK_EMBED_BATCH_ITEMS,
+                 concurrency: int = BULK_EMBED_CONCURRENCY, retries: int = BULK_EMBED_RETRIES,
+                 backoff: float = 1.0, max_backoff: float = 60.0, report_every: float = 2.0):
+        self.create = create
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.report_every = report_every
+        self._lock = threading.Lock()
+        self.texts = self.tokens = self.requests = self.retried = 0
+        self.started = None
+        self._last_report = 0.0
+
+    def __call__(self, texts: list) -> list:
+        if self.started is None:
+            self.started = self._last_report = time.perf_counter()
+        batches = token_batches(texts, self.max_tokens, self.max_items)
+        with ThreadPoolExecutor(min(self.concurrency, len(batches) or 1), thread_name_prefix="embed") as pool:
+            parts = list(pool.map(lambda b: self._send(texts[b[0]:b[1]]), batches))
+        self.report(force=True)
+        return [v for part in parts for v in part]
+
+    def _send(self, batch: list) -> list:
+        for attempt in range(self.retries + 1):
+            try:
+                vectors = self.create(batch)
+                break
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                with self._lock:
+                    self.retried += 1
+                print(f"⚠️ Embedding request failed ({type(e).__name__}), retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
+        if len(vectors) != len(batch):
+            raise ValueError(f"asked for {len(batch)} embeddings, got {len(vectors)}")
+        with self._lock:
+            self.texts += len(batch)
+            self.tokens += sum(estimate_tokens(t) for t in batch)
+            self.requests += 1
+        self.report()
+        return vectors
+
+    def report(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            if not force and now - self._last_report < self.report_every:
+                return
+            self._last_report = now
+            elapsed = max(now - (self.started or now), 1e-9)
+            line = (f"🔍 Embedded {self.texts} texts (~{self.tokens} tokens) in {self.requests} requests, "
+                    f"{elapsed:.1f}s: {self.texts / elapsed:.0f} texts/s, ~{self.tokens / elapsed:.0f} tokens/s"
+                    + (f", {self.retried} retries" if self.retried else ""))
+        print(line)
@@ -0,0 +1,114 @@
+# ─── SENTENCE-SPAN CHUNKER ──────────────────────────────────
+#
+# Pages are split into sentence spans (start, end offsets into the page
+# text) and packed into chunks of up to `max_tokens` tokens.
+# Consecutive chunks share their trailing sentences, up to
+# `overlap_tokens`. Chunk text is one slice of the page, so building a
+# chunk never copies more than the chunk itself and a page is chunked in
+# linear time. Sentences longer than the budget are cut at whitespace;
+# only the candidate piece is counted, and the rest of a long sentence is
+# counted whole only once it is within a bounded lookahead, so tokenizer
+# work is linear in the page too.
+#
+# Tokens are counted with tiktoken's cl100k_base (the text-embedding-3
+# tokenizer) when it is installed. Without it they are *estimated* at ~4
+# characters per token (bulk_embed.estimate_tokens), which can be off
+# either way for non-prose text; TOKENIZER records which one built a KB.
+#
+import re
+from collections import deque
+
+from bulk_embed import estimate_tokens
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:          # not installed, or its BPE file can't be fetched
+    _ENCODING = None
+
+TOKENIZER      = "cl100k_base" if _ENCODING else "chars/4"
+CHUNK_TOKENS   = 200      # ≈ the old 800-character chunks
+OVERLAP_TOKENS = 40
+MIN_PAGE_CHARS = 50
+LOOKAHEAD_CHARS_PER_TOKEN = 16   # spans longer than budget × this are never counted whole
+
+_SENTENCE = re.compile(r"\S.*?(?:[.!?]+(?=\s|\Z)|\Z)", re.S)
+_WORD_GAP = re.compile(r"\s+")
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def _cut(text: str, start: int, limit: int):
+    """(piece end, next start) for a piece of at most `limit` chars, ending at whitespace if possible."""
+    cut = start + limit
+    gap = None
+    for gap in _WORD_GAP.finditer(text, start + limit // 2, cut):
+        pass
+    return (gap.start(), gap.end()) if gap else (cut, cut)
+
+
+def _split_long(text: str, start: int, end: int, max_tokens: int):
+    """Yield (start, end, tokens) pieces of text[start:end], each at most `max_tokens`."""
+    full = max_tokens * 4 - 1               # the most chars the estimate allows
+    limit = full
+    while start < end:
+        if end - start <= max_tokens * LOOKAHEAD_CHARS_PER_TOKEN:
+            tokens = count_tokens(text[start:end])
+            if tokens <= max_tokens:
+                yield start, end, tokens
+                return
+        limit = min(limit, end - start)
+        while True:
+            piece_end, next_start = _cut(text, start, limit)
+            piece = count_tokens(text[start:piece_end])
+            if piece <= max_tokens or limit == 1:
+                break
+            limit = max(1, limit * 3 // 4)  # dense text (numbers, URLs): try a shorter piece
+        yield start, piece_end, piece
+        start = next_start
+        limit = min(full, limit * 2)        # start the next piece near the size that fit
+
+
+def sentence_spans(text: str, max_tokens: int = CHUNK_TOKENS):
+    """Yield (start, end, tokens) for each sentence, none over `max_tokens`."""
+    for m in _SENTENCE.finditer(text):
+        start, end = m.start(), m.end()
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        yield from _split_long(text, start, end, max_tokens)
+
+
+def chunk_spans(text: str, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS):
+    """Yield (start, end) offsets of overlapping chunks covering `text`."""
+    window, tokens = deque(), 0
+    for span in sentence_spans(text, max_tokens):
+        if window and tokens + span[2] > max_tokens:
+            yield window[0][0], window[-1][1]
+            # keep trailing sentences as overlap, leaving room for the new one
+            while window and (tokens > overlap_tokens or tokens + span[2] > max_tokens):
+                tokens -= window.popleft()[2]
+        window.append(span)
+        tokens += span[2]
+    if window:
+        yield window[0][0], window[-1][1]
+
+
+def chunk_pages(pages, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS):
+    """Yield chunk dicts ({text, url, type, chunk, start, end}) for an iterable of page dicts."""
+    for page in pages:
+        text = page.get("text", "")
+        if len(text.strip()) < MIN_PAGE_CHARS:
+            continue
+        for i, (start, end) in enumerate(chunk_spans(text, max_tokens, overlap_tokens)):
+            yield {
+                "text": text[start:end],
+                "url": page.get("url", ""),
+                "type": page.get("type", "html"),
+                "chunk": i,
+                "start": start,
+                "end": end,
+            }
@@ -0,0 +1,124 @@
+# ─── PERSISTENT CRAWL STATE ─────────────────────────────────
+#
+# Per-URL validators (ETag / Last-Modified), a hash of the cleaned text,
+# and the text + outbound links themselves, so a 304 Not Modified page can
+# still be emitted and followed without re-downloading it.
+#
+# The `frontier` table is the crawl in progress: every URL queued, in BFS
+# order, with its depth and status (queued / added / modified / unchanged
+# for emitted pages, skipped, gone, failed). It is updated as each URL
+# completes, so an interrupted crawl can be resumed from it.
+#
+# Each stored page also records the crawl that stored it and the change
+# status it got, written together with the page. A page re-fetched after a
+# resume was already overwritten by the interrupted run, so it has to
+# carry that status (e.g. `added`) rather than be compared with itself.
+#
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_PATH = "output/crawl_state.sqlite"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT NOT NULL,"
+            " text TEXT NOT NULL, links TEXT NOT NULL, type TEXT NOT NULL, fetched_at REAL NOT NULL,"
+            " crawl_id TEXT, status TEXT)"
+        )
+        columns = {r[1] for r in self._db.execute("PRAGMA table_info(pages)")}
+        for column in ("crawl_id", "status"):          # state files from before these columns
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE pages ADD COLUMN {column} TEXT")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE NOT NULL,"
+            " depth INTEGER NOT NULL, status TEXT NOT NULL DEFAULT 'queued')"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+        row = self._db.execute("SELECT value FROM meta WHERE key='crawl_id'").fetchone()
+        self.crawl_id = row[0] if row else None
+
+    def get(self, url: str):
+        """Return the stored record for `url` as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content_hash, text, links, type, crawl_id, status"
+                " FROM pages WHERE url=?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_hash, text, links, page_type, crawl_id, status = row
+        return {"etag": etag, "last_modified": last_modified, "content_hash": content_hash,
+                "text": text, "links": json.loads(links), "type": page_type,
+                # the status this crawl gave the page, if this crawl stored it
+                "this_crawl": status if crawl_id is not None and crawl_id == self.crawl_id else None}
+
+    def put(self, url: str, page: dict, links: list, etag=None, last_modified=None, status=None) -> None:
+        """Store a fetched page with its change status in the current crawl."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?,?,?,?,?,?,?,?,?,?)",
+                (url, etag, last_modified, text_hash(page["text"]), page["text"],
+                 json.dumps(links), page.get("type", "html"), time.time(), self.crawl_id, status),
+            )
+            self._db.commit()
+
+    def urls(self) -> set:
+        with self._lock:
+            return {r[0] for r in self._db.execute("SELECT url FROM pages")}
+
+    def remove(self, urls) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM pages WHERE url=?", [(u,) for u in urls])
+            self._db.commit()
+
+    # ─── frontier ───
+    def reset_frontier(self) -> None:
+        """Start a new crawl: empty frontier, fresh crawl id."""
+        with self._lock:
+            self.crawl_id = uuid.uuid4().hex
+            self._db.execute("DELETE FROM frontier")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('crawl_id', ?)", (self.crawl_id,))
+            self._db.commit()
+
+    def enqueue(self, items) -> None:
+        """Queue (url, depth) pairs; URLs already in the frontier are ignored."""
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO frontier (url, depth) VALUES (?,?)", items)
+            self._db.commit()
+
+    def finish(self, url: str, status: str, links=()) -> None:
+        """Record `url`'s outcome and queue the links it led to, in one transaction."""
+        with self._lock:
+            self._db.execute("UPDATE frontier SET status=? WHERE url=?", (status, url))
+            self._db.executemany("INSERT OR IGNORE INTO frontier (url, depth) VALUES (?,?)", links)
+            self._db.commit()
+
+    def load_frontier(self):
+        """Return (all urls, [(url, depth)] still to fetch, [(url, status)] finished)."""
+        with self._lock:
+            rows = self._db.execute("SELECT url, depth, status FROM frontier ORDER BY seq").fetchall()
+        seen = {url for url, _, _ in rows}
+        todo = [(url, depth) for url, depth, status in rows if status in ("queued", "failed")]
+        done = [(url, status) for url, _, status in rows if status not in ("queued", "failed")]
+        return seen, todo, done
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,233 @@
+# ─── SITE CRAWLER ───────────────────────────────────────────
+#
+# Breadth-first crawl over an explicit frontier with a bounded thread
+# pool and one pooled requests.Session. Every URL is recorded as attempted
+# when it is queued, so nothing is fetched twice (including pages that
+# fail or are too short to keep). Requests to the same host are limited to
+# `per_host` at a time and spaced at least `delay` seconds apart.
+#
+# With a CrawlState the crawl is incremental: requests carry If-None-Match /
+# If-Modified-Since, a 304 re-emits the stored page, and every emitted URL
+# is classified in `changes` as added, modified or unchanged. A stored page
+# whose fetch fails (network error, timeout, 5xx) is re-emitted from the
+# state like a 304, so one bad night doesn't drop it; only 404/410 marks a
+# page `gone`. The frontier is checkpointed in the state as URLs complete;
+# with `resume=True` an interrupted crawl carries on from it: finished
+# pages are re-emitted from the store instead of being fetched again,
+# queued and failed URLs are fetched. A URL that was in flight when the
+# crawl died may already be stored; it keeps the status it got then
+# (`added` stays `added`), not `unchanged` against its own copy.
+#
+import re
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+from crawl_state import text_hash
+
+EXCLUDE_PATTERNS = ["wp-login", "login", "contact-form", "admin", "cookie", "feed", "rss", "mailto:", ".ics"]
+MIN_TEXT_LENGTH = 150
+GONE_STATUSES = (404, 410)
+
+
+def clean_text(soup):
+    for tag in soup(["script", "style", "header", "footer", "nav", "noscript", "iframe"]):
+        tag.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    return re.sub(r"\s+", " ", text)
+
+
+class HostLimiter:
+    """Per-host concurrency cap plus a minimum gap between request starts."""
+
+    def __init__(self, per_host: int, delay: float):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    def __call__(self, host: str):
+        with self._lock:
+            slots = self._slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        return _HostSlot(self, host, slots)
+
+    def _wait_turn(self, host: str):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+
+class _HostSlot:
+    def __init__(self, limiter, host, slots):
+        self.limiter, self.host, self.slots = limiter, host, slots
+
+    def __enter__(self):
+        self.slots.acquire()
+        self.limiter._wait_turn(self.host)
+
+    def __exit__(self, *exc):
+        self.slots.release()
+
+
+class Crawler:
+    def __init__(self, seeds, max_depth: int = 2, workers: int = 8, per_host: int = 2,
+                 delay: float = 0.25, timeout: float = 10, session=None, state=None, resume: bool = False):
+        self.seeds = [seeds] if isinstance(seeds, str) else list(seeds)
+        self.hosts = {urlparse(s).netloc for s in self.seeds}
+        self.max_depth = max_depth
+        self.workers = workers
+        self.timeout = timeout
+        self.limiter = HostLimiter(per_host, delay)
+        self.session = session or self._make_session(workers)
+        self.state = state
+        self.resume = resume and state is not None
+        self.attempted = set()
+        self.gone = set()
+        self.changes = {"added": [], "modified": [], "unchanged": []}
+
+    @staticmethod
+    def _make_session(workers: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = "PEN-Reply-KB-Crawler/1.0"
+        return session
+
+    def is_valid_url(self, href: str) -> bool:
+        if not href:
+            return False
+        parsed = urlparse(href)
+        if parsed.scheme not in ("http", "https") or parsed.netloc not in self.hosts:
+            return False
+        if any(x in href for x in EXCLUDE_PATTERNS):
+            return False
+        return True
+
+    def fetch(self, url: str):
+        """
+        Return (page dict | None, [links], status) for one URL. Status is the
+        change status for a page, else "gone", "failed" or None (skipped).
+        """
+        prev = self.state.get(url) if self.state else None
+        headers = {}
+        if prev and prev["etag"]:
+            headers["If-None-Match"] = prev["etag"]
+        if prev and prev["last_modified"]:
+            headers["If-Modified-Since"] = prev["last_modified"]
+
+        try:
+            with self.limiter(urlparse(url).netloc):
+                response = self.session.get(url, timeout=self.timeout, headers=headers)
+        except requests.RequestException as e:
+            if not prev:
+                raise
+            print(f"⚠️ Failed to crawl {url} ({e}), keeping the stored copy.")
+            return self._stored(url, prev)
+
+        if response.status_code == 304 and prev:
+            return self._stored(url, prev)
+        if response.status_code in GONE_STATUSES:
+            return None, [], "gone"
+        if response.status_code >= 500:
+            if not prev:
+                return None, [], "failed"
+            print(f"⚠️ {url} returned {response.status_code}, keeping the stored copy.")
+            return self._stored(url, prev)
+        if not response.ok or "text/html" not in response.headers.get("Content-Type", ""):
+            return None, [], None
+        soup = BeautifulSoup(response.text, "html.parser")
+        links = [urljoin(url, a['href'].split('#')[0]) for a in soup.find_all("a", href=True)]
+        text = clean_text(soup)
+        if len(text) < MIN_TEXT_LENGTH:
+            return None, [], None
+
+        page = {"url": url, "text": text, "type": "html"}
+        if prev is None:
+            status = "added"
+        elif prev["content_hash"] != text_hash(text):
+            status = "added" if prev["this_crawl"] == "added" else "modified"
+        else:
+            status = prev["this_crawl"] or "unchanged"
+        if self.state:
+            self.state.put(url, page, links, etag=response.headers.get("ETag"),
+                           last_modified=response.headers.get("Last-Modified"), status=status)
+        return page, links, status
+
+    @staticmethod
+    def _stored(url: str, prev: dict):
+        page = {"url": url, "text": prev["text"], "type": prev["type"]}
+        return page, prev["links"], prev["this_crawl"] or "unchanged"
+
+    def removed(self, previous_urls) -> list:
+        """Stored URLs to drop: those now 404/410 and those no longer linked from the site."""
+        return sorted(u for u in previous_urls if u in self.gone or u not in self.attempted)
+
+    def crawl(self):
+        """Yield page dicts as they are fetched, breadth-first from the seeds."""
+        frontier = deque()
+        if self.resume:
+            seen, todo, done = self.state.load_frontier()
+            self.attempted |= seen
+            frontier.extend(todo)
+            for url, status in done:
+                if status == "gone":
+                    self.gone.add(url)
+                stored = self.state.get(url) if status in self.changes else None
+                if stored:
+                    self.changes[status].append(url)
+                    yield {"url": url, "text": stored["text"], "type": stored["type"]}
+            print(f"🔁 Resuming crawl: {len(done)} URLs done, {len(todo)} to fetch.")
+        elif self.state:
+            self.state.reset_frontier()
+
+        seeds = [s for s in dict.fromkeys(self.seeds) if s not in self.attempted]
+        self.attempted.update(seeds)
+        frontier.extend((s, 0) for s in seeds)
+        if self.state:
+            self.state.enqueue([(s, 0) for s in seeds])
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="crawl") as pool:
+            running = {}
+            while frontier or running:
+                while frontier and len(running) < self.workers:
+                    url, depth = frontier.popleft()
+                    running[pool.submit(self.fetch, url)] = (url, depth)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    url, depth = running.pop(fut)
+                    try:
+                        page, links, status = fut.result()
+                    except Exception as e:
+                        print(f"⚠️ Failed to crawl {url}: {e}")
+                        if self.state:
+                            self.state.finish(url, "failed")
+                        continue
+                    if page is None:
+                        if status == "gone":
+                            self.gone.add(url)
+                        if self.state:
+                            self.state.finish(url, status or "skipped")
+                        continue
+                    self.changes[status].append(url)
+                    queued = []
+                    if depth < self.max_depth:
+                        for link in links:
+                            if link not in self.attempted and self.is_valid_url(link):
+                                self.attempted.add(link)
+                                queued.append((link, depth + 1))
+                    frontier.extend(queued)
+                    if self.state:
+                        self.state.finish(url, status, queued)
+                    yield page
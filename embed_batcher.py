@@ -0,0 +1,101 @@
+# ─── EMBEDDING MICRO-BATCHER ────────────────────────────────
+#
+# Concurrent embed requests inside one worker are held for up to
+# `window_ms` (or until `max_batch` texts are queued) and sent as one
+# multi-input embeddings call; each caller gets back its own vectors.
+#
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+DEFAULT_MAX_BATCH = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+DEFAULT_INFLIGHT  = int(os.getenv("EMBED_BATCH_INFLIGHT", "4"))
+
+
+class _Pending:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    def __init__(self, create, window_ms: float = DEFAULT_WINDOW_MS,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_inflight: int = DEFAULT_INFLIGHT):
+        """
+        `create(texts) -> list[vector]` performs the actual multi-input call;
+        up to `max_inflight` batches may be waiting on the API at once.
+        """
+        self.create = create
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_inflight = max_inflight
+        self.calls = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_worker(self):
+        # gunicorn forks after import, so start (or restart) the thread per process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._pool = ThreadPoolExecutor(self.max_inflight, thread_name_prefix="embed-flush")
+                    threading.Thread(target=self._run, daemon=True, name="embed-batcher").start()
+                    self._pid = os.getpid()
+
+    def embed(self, texts: list) -> list:
+        """Block until `texts` have been embedded as part of some batch."""
+        if not texts:
+            return []
+        if self.window <= 0:
+            self.calls += 1
+            return self.create(texts)
+        self._ensure_worker()
+        item = _Pending(list(texts))
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run(self):
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.window
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item.texts)
+            self._pool.submit(self._flush, batch)
+
+    def _flush(self, batch):
+        texts = [t for item in batch for t in item.texts]
+        try:
+            self.calls += 1
+            vectors = self.create(texts)
+        except Exception as e:
+            for item in batch:
+                item.error = e
+                item.done.set()
+            return
+        pos = 0
+        for item in batch:
+            item.result = vectors[pos:pos + len(item.texts)]
+            pos += len(item.texts)
+            item.done.set()
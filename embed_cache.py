@@ -0,0 +1,113 @@
+# ─── PERSISTENT EMBEDDING CACHE ─────────────────────────────
+#
+# Content-addressed: key = sha256(model + normalised text), value = float32
+# vector. Stored in SQLite so every gunicorn worker and the offline build
+# scripts share one cache; least-recently-used rows are evicted past
+# `max_entries`.
+#
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+DEFAULT_PATH        = os.getenv("EMBED_CACHE_PATH", "embeddings/embed_cache.sqlite")
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+
+
+def normalise_text(text: str) -> str:
+    """Collapse all whitespace (incl. newlines) so trivially different pastes share a key."""
+    return " ".join(text.split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalise_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _db(self) -> sqlite3.Connection:
+        # one connection per process – never reuse a handle across a fork
+        if self._conn is None or self._pid != os.getpid():
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vec BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, model: str, texts: list) -> list:
+        """Return a list aligned with `texts`: cached vector or None."""
+        keys = [cache_key(model, t) for t in texts]
+        found = {}
+        with self._lock:
+            db = self._db()
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                rows = db.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update({k: np.frombuffer(v, dtype=np.float32) for k, v in rows})
+            if found:
+                now = time.time()
+                db.executemany("UPDATE embeddings SET last_used=? WHERE key=?", [(now, k) for k in found])
+                db.commit()
+        return [found.get(k) for k in keys]
+
+    def put_many(self, model: str, texts: list, vectors: list) -> None:
+        now = time.time()
+        rows = [(cache_key(model, t), np.asarray(v, dtype=np.float32).tobytes(), now)
+                for t, v in zip(texts, vectors)]
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO embeddings (key, vec, last_used) VALUES (?,?,?)", rows)
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        (count,) = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def embed_with_cache(texts: list, model: str, create, cache: EmbeddingCache, batch_size: int = 100) -> list:
+    """
+    Embed `texts`, calling `create(batch) -> list[vector]` only for texts
+    missing from `cache`. Duplicate texts are sent once. Returns float32
+    vectors aligned with `texts`.
+    """
+    texts = [normalise_text(t) for t in texts]
+    vectors = cache.get_many(model, texts) if cache is not None else [None] * len(texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+
+    fresh = {}
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        embedded = [np.asarray(v, dtype=np.float32) for v in create(batch)]
+        fresh.update(zip(batch, embedded))
+        if cache is not None:
+            cache.put_many(model, batch, embedded)
+
+    return [v if v is not None else fresh[t] for t, v in zip(texts, vectors)]
@@ -1,43 +1,57 @@
-import os, json, pickle
-import numpy as np
+# Rebuilds the single index in embeddings/ from embeddings/clean_chunks.json,
+# or from a chunks .jsonl given as the first argument (e.g. output/chunks.jsonl).
+# For scrape → chunk → embed → index per school, use build_kb.py.
+import os, sys, json, pickle
 from dotenv import load_dotenv
-import openai
 
-# Load your OpenAI API key from .env or environment
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kb_index import index_exists, load_index, save_index
+from build_kb import EMBED_MODEL, embed_chunks, openai_create, text_key
+from page_store import iter_jsonl
+
+# Load your OpenAI API key from .env or environment (OPENAI_BASE_URL points it at a stand-in server)
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # Config
-INPUT_FILE = "embeddings/clean_chunks.json"
+INPUT_FILE = sys.argv[1] if len(sys.argv) > 1 else "embeddings/clean_chunks.json"
 OUTPUT_FILE = "embeddings/metadata.pkl"
-EMBED_MODEL = "text-embedding-3-small"
+INDEX_DIR = "embeddings"
 
 # Load clean chunks
-with open(INPUT_FILE, "r", encoding="utf-8") as f:
-    chunks = json.load(f)
+if INPUT_FILE.endswith(".jsonl"):
+    chunks = list(iter_jsonl(INPUT_FILE))
+else:
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
 
 texts = [c["text"] for c in chunks]
 
-# Batch embed
-def get_embeddings(texts, model):
-    all_embeddings = []
-    batch_size = 100
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        response = openai.embeddings.create(input=batch, model=model)
-        all_embeddings.extend([e.embedding for e in response.data])
-    return all_embeddings
 
-# Generate embeddings
-print(f"🔍 Embedding {len(texts)} chunks...")
-embeddings = get_embeddings(texts, EMBED_MODEL)
+def previous_vectors(model):
+    """{text hash: vector} from the current index, if it was built with `model`."""
+    if not index_exists(INDEX_DIR):
+        return {}
+    index, prev_chunks, meta = load_index(INDEX_DIR, quantization="none", two_stage=False)
+    if meta.get("model") != model:
+        print(f"⚠️ Existing index was built with {meta.get('model') or 'an unknown model'}, re-embedding everything.")
+        return {}
+    return {text_key(c["text"]): index.matrix[i] for i, c in enumerate(prev_chunks)}
+
+
+# Reuse vectors for unchanged chunks; embed only new/changed texts, in token-sized concurrent batches
+embeddings = embed_chunks(texts, EMBED_MODEL, openai_create, previous_vectors(EMBED_MODEL))
 
 # Save metadata file
 print("💾 Saving metadata.pkl...")
-with open(OUTPUT_FILE, "wb") as f:
+with open(OUTPUT_FILE + ".tmp", "wb") as f:
     pickle.dump({
-        "embeddings": np.array(embeddings),
+        "embeddings": embeddings,
         "metadata": chunks
     }, f)
+os.replace(OUTPUT_FILE + ".tmp", OUTPUT_FILE)
+
+# Save mmap-able index read by app.py (kb_meta.json is swapped in last)
+print("💾 Saving kb_meta.json + vectors...")
+save_index(INDEX_DIR, embeddings, chunks, model=EMBED_MODEL)
 
-print("✅ Done! metadata.pkl is ready.")
+print("✅ Done! metadata.pkl and the KB index are ready.")
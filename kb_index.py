@@ -0,0 +1,161 @@
+# ─── ON-DISK KB INDEX ───────────────────────────────────────
+#
+# kb_vectors-<hash>.npy – row-normalised float32 matrix, opened with mmap so
+#                         every gunicorn worker shares the same page-cache pages
+# kb_ivf-<hash>.npz     – optional IVF lists for approximate search (large KBs)
+# kb_lexical-<hash>.npz – BM25 postings over the chunk texts
+# kb_int8-<hash>.npz    – int8 codes + row scales (served with KB_QUANTIZATION=int8)
+# kb_pq-<hash>.npz      – optional product-quantization codes (KB_QUANTIZATION=pq)
+# kb_prefix-<hash>.npy  – first PREFIX_DIM dims, re-normalised, for two-stage search
+# kb_meta.json          – {"model", "dim", "count", "vectors_file", "ann", "lexical",
+#                          "quantized": {"int8", "pq"}, "prefix": {"file", "dim"}, "chunks": [...]}
+#
+# kb_meta.json is replaced last and names the vectors file it belongs to,
+# so swapping it in is the single atomic step of a rebuild: a reader sees
+# either the old index or the new one, never a mix.
+#
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+
+from retrieval import VectorIndex, normalise_rows
+from ann import ANN_MIN_ROWS, ANN_NPROBE, IVFIndex
+from lexical import LEXICAL_VERSION, LexicalIndex
+from quantized import KB_QUANTIZATION, Int8Index, PQIndex, quantized_index
+from two_stage import KB_TWO_STAGE, PREFIX_DIM, TwoStageIndex, prefix_rows
+
+VECTORS_FILE = "kb_vectors.npy"          # name used before vectors files were content-addressed
+META_FILE    = "kb_meta.json"
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def index_exists(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, META_FILE))
+
+
+def read_meta(directory: str) -> dict:
+    with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def index_files(directory: str) -> list:
+    """Paths of the files making up the current index (for fingerprinting)."""
+    meta = read_meta(directory)
+    files = [META_FILE, meta.get("vectors_file", VECTORS_FILE)]
+    if meta.get("ann"):
+        files.append(meta["ann"]["file"])
+    if meta.get("lexical"):
+        files.append(meta["lexical"])
+    files.extend(name for name in (meta.get("quantized") or {}).values() if name)
+    if meta.get("prefix"):
+        files.append(meta["prefix"]["file"])
+    return [os.path.join(directory, name) for name in files]
+
+
+def save_index(directory: str, embeddings, chunks: list, model: str = "", ann=None, pq=None) -> None:
+    """
+    Write the embedding matrix and chunk metadata in the mmap-able format.
+    `ann` builds IVF lists as well: None means only for KBs of ANN_MIN_ROWS+.
+    Int8 codes are always written; `pq` codes when asked for (None: only if
+    KB_QUANTIZATION is "pq"), as training them takes a while.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = normalise_rows(embeddings)
+    if len(matrix) != len(chunks):
+        raise ValueError(f"{len(matrix)} embeddings but {len(chunks)} chunks")
+
+    tag = hashlib.sha256(matrix.tobytes()).hexdigest()[:12]
+    vectors_file = f"kb_vectors-{tag}.npy"
+    texts = [c.get("text", "") for c in chunks]
+    texts_tag = hashlib.sha256(json.dumps([LEXICAL_VERSION, texts]).encode("utf-8")).hexdigest()[:12]
+    lexical_file = f"kb_lexical-{texts_tag}.npz"
+    meta = {
+        "model": model,
+        "dim": int(matrix.shape[1]) if matrix.size else 0,
+        "count": len(chunks),
+        "vectors_file": vectors_file,
+        "ann": None,
+        "lexical": lexical_file,
+        "quantized": {"int8": f"kb_int8-{tag}.npz", "pq": None},
+        "prefix": None,
+        "chunks": chunks,
+    }
+    _atomic_write(os.path.join(directory, vectors_file), lambda f: np.save(f, matrix))
+    if ann or (ann is None and len(matrix) >= ANN_MIN_ROWS):
+        ivf = IVFIndex.build(matrix)
+        meta["ann"] = {"type": "ivf", "file": f"kb_ivf-{tag}.npz", "nlist": ivf.nlist}
+        _atomic_write(os.path.join(directory, meta["ann"]["file"]), ivf.save)
+    _atomic_write(os.path.join(directory, lexical_file), LexicalIndex.build(texts).save)
+    _atomic_write(os.path.join(directory, meta["quantized"]["int8"]), Int8Index.build(matrix).save)
+    if len(matrix) and (pq or (pq is None and KB_QUANTIZATION == "pq")):
+        meta["quantized"]["pq"] = f"kb_pq-{tag}.npz"
+        _atomic_write(os.path.join(directory, meta["quantized"]["pq"]), PQIndex.build(matrix).save)
+    if matrix.size and matrix.shape[1] > PREFIX_DIM:
+        meta["prefix"] = {"file": f"kb_prefix-{tag}.npy", "dim": PREFIX_DIM}
+        _atomic_write(os.path.join(directory, meta["prefix"]["file"]), lambda f: np.save(f, prefix_rows(matrix)))
+    _atomic_write(os.path.join(directory, META_FILE),
+                  lambda f: f.write(json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")))
+
+    # running workers keep their mmap of an unlinked file, so old matrices can go
+    keep = {vectors_file, lexical_file, meta["ann"] and meta["ann"]["file"], *meta["quantized"].values(),
+            meta["prefix"] and meta["prefix"]["file"]}
+    for old in [p for pattern in ("kb_vectors*.npy", "kb_ivf*.npz", "kb_lexical*.npz", "kb_int8*.npz", "kb_pq*.npz",
+                                  "kb_prefix*.npy")
+                for p in glob.glob(os.path.join(directory, pattern))]:
+        if os.path.basename(old) not in keep:
+            os.remove(old)
+
+
+def load_index(directory: str, nprobe: int = ANN_NPROBE, quantization: str = KB_QUANTIZATION,
+               two_stage: bool = KB_TWO_STAGE):
+    """
+    Return (index, chunks, meta) backed by a read-only memory map. With
+    `quantization` "int8" / "pq" rows are scored from those codes,
+    re-ranking against the mmap. The index is an IVFIndex if the build
+    stored IVF lists (it only scores the lists it probes, from the codes if
+    quantized), else an Int8Index / PQIndex when quantized, else a
+    TwoStageIndex if `two_stage` and a prefix matrix was stored, else a
+    VectorIndex.
+    """
+    meta = read_meta(directory)
+    matrix = np.load(os.path.join(directory, meta.get("vectors_file", VECTORS_FILE)), mmap_mode="r")
+    if matrix.shape[0] != meta["count"]:
+        raise ValueError(f"{directory}: {matrix.shape[0]} vectors but {meta['count']} chunks")
+    chunks = meta.pop("chunks")
+    quantized = None
+    if quantization not in ("", "none"):
+        stored = (meta.get("quantized") or {}).get(quantization)
+        if stored:
+            cls = Int8Index if quantization == "int8" else PQIndex
+            quantized = cls.load(os.path.join(directory, stored), exact=matrix)
+        else:
+            print(f"⚠️ {directory} has no stored {quantization} codes, quantizing in memory.")
+            quantized = quantized_index(matrix, quantization, exact=matrix)
+    if meta.get("ann"):
+        if two_stage:
+            print(f"⚠️ {directory} has IVF lists; KB_TWO_STAGE is not used with them.")
+        ivf = IVFIndex.load(os.path.join(directory, meta["ann"]["file"]), matrix, nprobe, quantized)
+        return ivf, chunks, meta
+    if quantized is not None:
+        return quantized, chunks, meta
+    if two_stage and meta.get("prefix"):
+        prefix = np.load(os.path.join(directory, meta["prefix"]["file"]))     # in RAM: scanned every query
+        return TwoStageIndex(matrix, prefix, prefix_dim=meta["prefix"]["dim"]), chunks, meta
+    return VectorIndex(matrix, normalised=True), chunks, meta
+
+
+def load_lexical(directory: str, meta: dict, chunks: list):
+    """The BM25 index saved with the KB, or one built now for indexes that predate it."""
+    if meta.get("lexical"):
+        return LexicalIndex.load(os.path.join(directory, meta["lexical"]))
+    return LexicalIndex.build([c.get("text", "") for c in chunks])
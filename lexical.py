@@ -0,0 +1,166 @@
+# ─── BM25 LEXICAL INDEX + HYBRID FUSION ─────────────────────
+#
+# Catches exact-term enquiries ("Year of Entry Calculator", "11+", fee
+# terms) that cosine similarity alone ranks too low.
+#
+# Stored as flat arrays: `terms` (sorted, looked up with searchsorted),
+# `offsets` into `doc_ids` / `impacts`, where each posting's impact is its
+# precomputed BM25 term weight. A query is a few slices, one bincount and
+# a top-k; loading is one small .npz read, no dict or JSON to rebuild.
+#
+# Terms are single words plus adjacent-word pairs ("entry calculator"),
+# so phrase matches also score higher.
+#
+# /reply passes the whole parent email, so neither raw BM25 nor the share
+# of the query matched can gate a lexical-only hit: both move with email
+# length. A chunk is a lexical hit only if it shares a *key term* with the
+# query – a word pair or a token with a digit ("11+", "2026") – whose idf
+# is at least LEXICAL_KEY_IDF. Single plain words never qualify (those are
+# what cosine already handles, and what off-topic emails share with the KB
+# by chance); the number of other words in the email doesn't matter.
+#
+import os
+import re
+import numpy as np
+
+from retrieval import EMPTY_RESULT, top_k
+
+BM25_K1 = 1.2
+BM25_B  = 0.75
+LEXICAL_KEY_IDF   = float(os.getenv("LEXICAL_KEY_IDF", "1.0"))     # min idf of a shared key term
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))        # per ranker, before fusion
+RRF_K = 60
+LEXICAL_VERSION = 3          # bump when index_terms() changes; part of the saved index's name
+
+_TOKEN = re.compile(r"[a-z0-9]+\+?")
+_DIGIT = re.compile(r"\d")
+STOPWORDS = frozenset("""
+a about am an and any are as at be been but by can could do does for from had has have hello hi how i
+if in is it its me my no not of on or our please so some than that the their them then there these
+they this to us was we were what when where whether which who will with would you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Lower-cased alphanumeric runs minus stopwords; a trailing '+' is kept so '11+' ≠ '11'."""
+    return [tok for tok in _TOKEN.findall(text.lower()) if tok not in STOPWORDS]
+
+
+def index_terms(text: str) -> list:
+    """tokenize() plus every adjacent pair of tokens, joined by a space."""
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def is_key_term(term: str) -> bool:
+    return " " in term or bool(_DIGIT.search(term))
+
+
+def idf(df, n: int):
+    return np.log(1 + (n - df + 0.5) / (df + 0.5))
+
+
+class LexicalIndex:
+    def __init__(self, terms, offsets, doc_ids, impacts, n_docs: int):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.n_docs = int(n_docs)
+
+    @classmethod
+    def build(cls, texts):
+        postings = {}                     # term -> {doc: tf}
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+        for doc, text in enumerate(texts):
+            tokens = index_terms(text)
+            doc_len[doc] = len(tokens)
+            for tok in tokens:
+                tf = postings.setdefault(tok, {})
+                tf[doc] = tf.get(doc, 0) + 1
+
+        terms = sorted(postings)
+        n = len(texts)
+        avgdl = float(doc_len.mean()) if n else 0.0
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, impacts = [], []
+        for t, term in enumerate(terms):
+            docs = np.fromiter(postings[term].keys(), dtype=np.int32)
+            tf = np.fromiter(postings[term].values(), dtype=np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[docs] / (avgdl or 1))
+            doc_ids.append(docs)
+            impacts.append((idf(len(docs), n) * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32))
+            offsets[t + 1] = offsets[t] + len(docs)
+
+        return cls(
+            np.array(terms, dtype=str) if terms else np.zeros(0, dtype="<U1"),
+            offsets,
+            np.concatenate(doc_ids) if doc_ids else np.zeros(0, dtype=np.int32),
+            np.concatenate(impacts) if impacts else np.zeros(0, dtype=np.float32),
+            n,
+        )
+
+    def save(self, f) -> None:
+        np.savez(f, terms=self.terms, offsets=self.offsets, doc_ids=self.doc_ids,
+                 impacts=self.impacts, n_docs=np.int64(self.n_docs))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls(data["terms"], data["offsets"], data["doc_ids"], data["impacts"], data["n_docs"])
+
+    @property
+    def nbytes(self) -> int:
+        return self.terms.nbytes + self.offsets.nbytes + self.doc_ids.nbytes + self.impacts.nbytes
+
+    def search(self, query: str, k: int, key_idf: float = None):
+        """
+        Return (BM25 scores, doc indices) of the best `k` documents, best
+        first. With `key_idf`, only documents sharing a key term of at least
+        that idf with the query are kept.
+        """
+        tokens = list(dict.fromkeys(index_terms(query)))
+        if not tokens or not len(self.terms) or k <= 0:
+            return EMPTY_RESULT
+        pos = np.minimum(np.searchsorted(self.terms, tokens), len(self.terms) - 1)
+        found = self.terms[pos] == np.array(tokens)
+        df = np.where(found, self.offsets[pos + 1] - self.offsets[pos], 0)
+        weight = idf(df, self.n_docs)
+        slices = [slice(self.offsets[p], self.offsets[p + 1]) for p in pos[found]]
+        if not slices:
+            return EMPTY_RESULT
+        ids = np.concatenate([self.doc_ids[s] for s in slices])
+        scores = np.bincount(ids, weights=np.concatenate([self.impacts[s] for s in slices]),
+                             minlength=self.n_docs).astype(np.float32)
+        if key_idf is not None:
+            key = np.array([is_key_term(t) for t in tokens]) & (weight >= key_idf)
+            per_posting = np.repeat(key[found], [s.stop - s.start for s in slices])
+            scores[np.bincount(ids, weights=per_posting, minlength=self.n_docs) == 0] = 0
+        top, idx = top_k(scores, k)
+        keep = top > 0
+        return top[keep], idx[keep]
+
+
+def rrf_fuse(rankings, k: int, c: int = RRF_K):
+    """Reciprocal-rank fusion of several best-first index arrays → (scores, indices)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, i in enumerate(ranking):
+            fused[int(i)] = fused.get(int(i), 0.0) + 1.0 / (c + rank + 1)
+    best = sorted(fused.items(), key=lambda kv: -kv[1])[:k]
+    return (np.array([s for _, s in best], dtype=np.float32),
+            np.array([i for i, _ in best], dtype=np.intp))
+
+
+def hybrid_search(vector_index, lexical_index, q_vec, query: str, k: int, threshold: float,
+                  lexical_key_idf: float = LEXICAL_KEY_IDF, candidates: int = HYBRID_CANDIDATES):
+    """
+    Vector hits at or above `threshold` fused with BM25 hits sharing a key
+    term of idf `lexical_key_idf` or more with the query. Without a lexical
+    index this is plain vector search.
+    """
+    if lexical_index is None:
+        return vector_index.search(q_vec, k, threshold)
+    _, vec_idx = vector_index.search(q_vec, candidates, threshold)
+    _, lex_idx = lexical_index.search(query, candidates, lexical_key_idf)
+    return rrf_fuse([vec_idx, lex_idx], k)
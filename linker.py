@@ -0,0 +1,194 @@
+# ─── ANCHOR LINKER ──────────────────────────────────────────
+#
+# Turns anchor phrases in a reply into Markdown links in one linear pass,
+# using a case-insensitive Aho-Corasick automaton over every anchor.
+#
+# - longest match wins, scanning left to right (same as the old
+#   length-sorted regex alternation)
+# - an anchor that starts/ends with a word character must not be glued to
+#   another word character on that side
+# - text already inside a Markdown link or a bare URL is left alone
+# - "once" anchors (the tenant's site anchors: URL_MAPPING / URL_ALIASES for
+#   the default school, kb/<tenant>/url_mapping.json for others) link only
+#   the first mention of each URL, and not at all if the reply already
+#   links it; url_box anchors link every mention, as before
+#
+# Automatons are cached by a hash of the anchor map, so a tenant's site
+# anchors plus a given url_box are compiled once per worker.
+#
+import re
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+
+from url_mapping import URL_MAPPING, URL_ALIASES
+
+CACHE_SIZE = 64
+# existing Markdown links (label, url captured) and bare URLs
+_PROTECTED = re.compile(r"\[([^\]]*)\]\(([^)\s]*)[^)]*\)|https?://\S+")
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _lower(text: str) -> str:
+    """Lower-case without changing length, so offsets map back to `text`."""
+    low = text.lower()
+    if len(low) == len(text):
+        return low
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def resolve_anchors(mapping: dict, aliases: dict) -> dict:
+    """`mapping` plus `aliases` (alias → phrase in `mapping`) resolved to their target URLs."""
+    anchors = dict(mapping)
+    for alias, target in aliases.items():
+        if target in mapping:
+            anchors.setdefault(alias, mapping[target])
+    return anchors
+
+
+@lru_cache(maxsize=1)
+def site_anchors() -> dict:
+    """The default school's anchors: URL_MAPPING plus URL_ALIASES (read-only)."""
+    return resolve_anchors(URL_MAPPING, URL_ALIASES)
+
+
+class AnchorLinker:
+    def __init__(self, anchors: dict):
+        """`anchors` maps phrase → (url, once); the first entry for a phrase wins."""
+        self.patterns = []                 # (length, url, once, first_is_word, last_is_word)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        seen = set()
+        for phrase, (url, once) in anchors.items():
+            key = _lower(phrase.strip())
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            self._insert(key, len(self.patterns))
+            self.patterns.append((len(key), url, once, _is_word(key[0]), _is_word(key[-1])))
+        self._build_failure_links()
+
+    def _insert(self, key: str, pid: int):
+        node = 0
+        for ch in key:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append(pid)
+
+    def _build_failure_links(self):
+        queue = list(self.goto[0].values())
+        for node in queue:                       # BFS; list grows as we go
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def _matches(self, text: str, low: str):
+        """Yield (start, end, pid) for every boundary-respecting occurrence."""
+        goto, fail, out, pats = self.goto, self.fail, self.out, self.patterns
+        n = len(text)
+        node = 0
+        for i, ch in enumerate(low):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pid in out[node]:
+                length, _, _, first_word, last_word = pats[pid]
+                start, end = i + 1 - length, i + 1
+                if first_word and start > 0 and _is_word(text[start - 1]):
+                    continue
+                if last_word and end < n and _is_word(text[end]):
+                    continue
+                yield start, end, pid
+
+    def link(self, text: str) -> str:
+        return self.link_collect(text)[0]
+
+    def link_collect(self, text: str):
+        """
+        Return (linked_text, links) where links lists every Markdown link in
+        the result – the model's own and the inserted ones – as (label, url)
+        in reading order.
+        """
+        if not text:
+            return text, []
+
+        protected, links = [], []
+        for m in _PROTECTED.finditer(text):
+            protected.append(m.span())
+            if m.group(2) is not None:
+                links.append((m.start(), m.group(1).strip(), m.group(2)))
+        if not self.patterns:
+            return text, [(label, url) for _, label, url in links]
+        already_linked = {url for _, _, url in links}
+
+        # leftmost, then longest; drop overlaps and protected spans
+        candidates = sorted(self._matches(text, _lower(text)), key=lambda m: (m[0], -(m[1] - m[0])))
+        parts, pos, p_idx, linked_once = [], 0, 0, set()
+        for start, end, pid in candidates:
+            if start < pos:
+                continue
+            while p_idx < len(protected) and protected[p_idx][1] <= start:
+                p_idx += 1
+            if p_idx < len(protected) and protected[p_idx][0] < end:
+                continue
+            _, url, once, _, _ = self.patterns[pid]
+            if once and (url in linked_once or url in already_linked):
+                continue
+            if once:
+                linked_once.add(url)
+            parts.append(text[pos:start])
+            parts.append(f"[{text[start:end]}]({url})")
+            links.append((start, text[start:end], url))
+            pos = end
+        parts.append(text[pos:])
+        links.sort(key=lambda link: link[0])
+        return "".join(parts), [(label, url) for _, label, url in links]
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_linker(anchors: dict) -> AnchorLinker:
+    """Return a compiled linker for `anchors`, reusing one with identical content."""
+    key = hashlib.sha1(json.dumps(list(anchors.items()), ensure_ascii=False).encode("utf-8")).hexdigest()
+    with _cache_lock:
+        linker = _cache.get(key)
+        if linker is not None:
+            _cache.move_to_end(key)
+            return linker
+    linker = AnchorLinker(anchors)
+    with _cache_lock:
+        _cache[key] = linker
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return linker
+
+
+def build_anchor_map(url_map: dict, site: dict = None) -> dict:
+    """
+    Per-request url_box anchors (every mention) followed by the tenant's
+    `site` anchors (first mention only). AnchorLinker keeps the first entry
+    for a phrase, so url_box wins when both define the same text.
+    """
+    anchors = {phrase: (url, False) for phrase, url in url_map.items()}
+    for phrase, url in (site or {}).items():
+        anchors.setdefault(phrase, (url, True))
+    return anchors
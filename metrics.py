@@ -0,0 +1,19 @@
+# ─── IN-PROCESS METRICS ─────────────────────────────────────
+#
+# Simple per-worker counters, exposed as JSON on GET /metrics.
+#
+import threading
+from collections import Counter
+
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def incr(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] += n
+
+
+def snapshot() -> dict:
+    with _lock:
+        return dict(_counters)
@@ -0,0 +1,77 @@
+# ─── STREAMING JSONL PAGE STORE ─────────────────────────────
+#
+# Crawl (and chunk) output is written one JSON record per line as it is
+# produced, so memory stays flat however large the site is. While writing,
+# records go to `<path>.partial`, which is flushed + fsync'd every
+# `checkpoint_every` records / `checkpoint_secs` seconds; a crash leaves
+# that file readable up to the last checkpoint. On a clean close it is
+# renamed over `<path>`.
+#
+import os
+import json
+import time
+import hashlib
+
+
+class JsonlWriter:
+    def __init__(self, path: str, checkpoint_every: int = 50, checkpoint_secs: float = 5.0):
+        self.path = path
+        self.partial = f"{path}.partial"
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_secs = checkpoint_secs
+        self.count = 0
+        self._since = 0
+        self._last = time.monotonic()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(self.partial, "w", encoding="utf-8")
+
+    def write(self, record: dict) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+        self._since += 1
+        if self._since >= self.checkpoint_every or time.monotonic() - self._last >= self.checkpoint_secs:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._since = 0
+        self._last = time.monotonic()
+
+    def close(self, complete: bool = True) -> None:
+        if self._f.closed:
+            return
+        self.checkpoint()
+        self._f.close()
+        if complete:
+            os.replace(self.partial, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+
+
+def iter_jsonl(path: str):
+    """Yield records from a JSONL file, ignoring a torn last line from a crash."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                print(f"⚠️ {path}: ignoring incomplete last line")
+                return
+            if line.strip():
+                yield json.loads(line)
+
+
+def jsonl_digest(path: str) -> str:
+    """Content hash of a JSONL file that ignores record order."""
+    lines = []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.endswith(b"\n") and line.strip():
+                lines.append(hashlib.sha256(line).digest())
+    h = hashlib.sha256()
+    for d in sorted(lines):
+        h.update(d)
+    return h.hexdigest()
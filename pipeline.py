@@ -0,0 +1,64 @@
+# ─── STAGE-GRAPH EXECUTOR ───────────────────────────────────
+#
+# A request pipeline is a list of Stages. Each stage names the stages it
+# runs `after`; it is started as soon as those have finished and receives
+# their results as keyword arguments. Independent stages run concurrently.
+# A stage can return Finish(value) to end the whole run early – stages not
+# yet submitted are skipped and queued ones cancelled. Cancellation cannot
+# stop a stage that is already running (e.g. an LLM call in flight): it
+# runs to completion on its worker and its result is discarded.
+#
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class Finish:
+    """Returned by a stage to short-circuit the pipeline with `value`."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Stage:
+    def __init__(self, name: str, fn, after=()):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+
+
+def run_stages(stages: list, executor):
+    """
+    Run `stages` on `executor`. Returns (finished, value): (True, v) if a
+    stage returned Finish(v), else (False, {stage_name: result}).
+    Exceptions from any stage propagate once queued work is cancelled;
+    stages already running are not waited for, their results are dropped.
+    """
+    names = {s.name for s in stages}
+    for s in stages:
+        unknown = set(s.after) - names
+        if unknown:
+            raise ValueError(f"Stage '{s.name}' depends on unknown stage(s): {sorted(unknown)}")
+
+    results, pending, running = {}, list(stages), {}
+    while pending or running:
+        for s in [s for s in pending if all(d in results for d in s.after)]:
+            pending.remove(s)
+            running[executor.submit(s.fn, **{d: results[d] for d in s.after})] = s
+        if not running:
+            raise ValueError(f"Dependency cycle among stages: {[s.name for s in pending]}")
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for fut in done:
+            stage = running.pop(fut)
+            try:
+                value = fut.result()
+            except Exception:
+                for f in running:
+                    f.cancel()
+                raise
+            if isinstance(value, Finish):
+                for f in running:
+                    f.cancel()
+                return True, value.value
+            results[stage.name] = value
+    return False, results
@@ -0,0 +1,48 @@
+# ─── REPLY POST-PROCESSOR ───────────────────────────────────
+#
+# One pipeline for turning model Markdown into the HTML the front end
+# shows, shared by /reply, /reply-stream and /revise:
+#
+#   clean (one regex pass) → link (one Aho-Corasick pass, also yields the
+#   link list) → render (reused Markdown instance)
+#
+# The link list comes out of the linking pass, so the HTML is never
+# re-scanned for <a> tags.
+#
+import re
+import threading
+import markdown
+
+from linker import build_anchor_map, get_linker
+
+# Only the top of the reply is cleaned: "Subject: Maths is taught daily" in
+# the body is content, not a header.
+_CLEANUP = re.compile(
+    r"\A\s*(?:```(?:markdown)?[ \t]*\n?)?"     # opening code fence
+    r"\s*(?:markdown:[ \t]*)?"                 # stray 'markdown:' label
+    r"\s*(?:subject:[^\n]*(?:\n|\Z))?"         # leading 'Subject: …' line
+    r"|\s*```\s*\Z",                           # closing code fence
+    re.I,
+)
+
+_local = threading.local()
+
+
+def clean_gpt_email_output(md: str) -> str:
+    """Clean up GPT output to remove markdown/code block labels and subject lines."""
+    return _CLEANUP.sub("", md.strip()).strip()
+
+
+def render_markdown(text: str) -> str:
+    """markdown.markdown(), reusing one parser per thread instead of building one per call."""
+    md = getattr(_local, "md", None)
+    if md is None:
+        md = _local.md = markdown.Markdown()
+    return md.reset().convert(text)
+
+
+def postprocess_reply(reply_md: str, url_map: dict, site_anchors: dict = None) -> dict:
+    """Model Markdown → {"reply": html, "links": [(label, url), …]}; `site_anchors` are the tenant's."""
+    text = clean_gpt_email_output(reply_md)
+    text, links = get_linker(build_anchor_map(url_map, site_anchors)).link_collect(text)
+    return {"reply": render_markdown(text), "links": links}
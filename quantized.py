@@ -0,0 +1,200 @@
+# ─── QUANTIZED VECTOR STORAGE ───────────────────────────────
+#
+# Int8Index – one int8 code per dimension plus a float32 scale per row
+#             (4× smaller than float32, 8× smaller than float64).
+# PQIndex   – product quantization: each row is `m` one-byte codes into
+#             per-subspace codebooks (1536 dims, m=96 → 96 bytes/row).
+#
+# Both score in the quantized domain (int8 blocks widened on the fly; PQ
+# via per-query lookup tables) and can re-rank their best `rerank`
+# candidates exactly against the float32 matrix. That matrix stays an
+# on-disk mmap, so only the re-ranked rows are ever paged in.
+#
+# Same search()/add() interface as VectorIndex. search_rows() scores only
+# given rows, which is how IVFIndex scores its probed lists from the codes.
+#
+import os
+import numpy as np
+
+from retrieval import EMPTY_RESULT, normalise_rows, top_k, unit_query
+
+KB_QUANTIZATION   = os.getenv("KB_QUANTIZATION", "none")       # none | int8 | pq
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "64"))  # 0 = no exact re-rank
+PQ_SUBSPACES      = 96
+PQ_ITERS          = 10
+_BLOCK = 1024
+
+
+def quantize_int8(matrix):
+    """→ (int8 codes, float32 per-row scales) with row ≈ codes * scale."""
+    mat = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(mat).max(axis=1) / 127.0 if len(mat) else np.zeros(0, dtype=np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.rint(mat / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _rerank(exact, cand, q, k, threshold):
+    """Exact scores for candidate rows (sorted for mmap locality) → top k."""
+    cand = np.sort(cand)
+    top, pos = top_k(np.asarray(exact[cand]) @ q, k, threshold)
+    return top, cand[pos]
+
+
+def _search(index, approx, ids, q, k, threshold):
+    """Top k of rows `ids` (None: all) from their approximate scores, re-ranked exactly if possible."""
+    if index.exact is None or not index.rerank:
+        top, pos = top_k(approx, k, threshold)
+        return top, (pos if ids is None else ids[pos])
+    _, pos = top_k(approx, max(k, index.rerank))
+    return _rerank(index.exact, pos if ids is None else ids[pos], q, k, threshold)
+
+
+class Int8Index:
+    def __init__(self, codes=None, scales=None, exact=None, rerank: int = RERANK_CANDIDATES):
+        self.codes = codes if codes is not None else np.zeros((0, 0), dtype=np.int8)
+        self.scales = scales if scales is not None else np.zeros(0, dtype=np.float32)
+        self.exact = exact
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, matrix, exact=None, rerank: int = RERANK_CANDIDATES):
+        return cls(*quantize_int8(normalise_rows(matrix)), exact=exact, rerank=rerank)
+
+    def save(self, f) -> None:
+        np.savez(f, codes=self.codes, scales=self.scales)
+
+    @classmethod
+    def load(cls, path: str, exact=None, rerank: int = RERANK_CANDIDATES):
+        with np.load(path) as data:
+            return cls(data["codes"], data["scales"], exact, rerank)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def add(self, vec):
+        """Append one embedding, or a matrix of them (templates; no exact copy kept)."""
+        codes, scales = quantize_int8(normalise_rows(vec))
+        self.codes = codes if not len(self) else np.vstack([self.codes, codes])
+        self.scales = np.concatenate([self.scales, scales])
+
+    def scores(self, q) -> np.ndarray:
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), _BLOCK):
+            block = self.codes[start:start + _BLOCK]
+            out[start:start + len(block)] = (block.astype(np.float32) @ q) * self.scales[start:start + _BLOCK]
+        return out
+
+    def search(self, q_vec, k, threshold=None):
+        q = unit_query(q_vec)
+        if q is None or not len(self) or k <= 0:
+            return EMPTY_RESULT
+        return _search(self, self.scores(q), None, q, k, threshold)
+
+    def search_rows(self, q, ids, k, threshold=None):
+        """search() over rows `ids` only; `q` must be unit length."""
+        approx = (self.codes[ids].astype(np.float32) @ q) * self.scales[ids]
+        return _search(self, approx, ids, q, k, threshold)
+
+
+def quantized_index(matrix, mode: str = KB_QUANTIZATION, exact=None):
+    """Int8Index / PQIndex over `matrix` for `mode`, or None for "none"."""
+    if mode == "int8":
+        return Int8Index.build(matrix, exact=exact)
+    if mode == "pq":
+        return PQIndex.build(normalise_rows(matrix), exact=exact)
+    if mode not in ("", "none"):
+        raise ValueError(f"unknown KB_QUANTIZATION {mode!r} (none | int8 | pq)")
+    return None
+
+
+# ─── PRODUCT QUANTIZATION ───────────────────────────────────
+def _train_codebook(sub, ksub: int, iters: int, rng) -> np.ndarray:
+    """Plain (Euclidean) k-means for one subspace."""
+    cents = sub[rng.choice(len(sub), size=ksub, replace=False)].copy()
+    for _ in range(iters):
+        labels = np.argmin((cents ** 2).sum(1) - 2 * sub @ cents.T, axis=1)
+        sums = np.zeros_like(cents)
+        np.add.at(sums, labels, sub)
+        counts = np.bincount(labels, minlength=ksub)
+        filled = counts > 0
+        cents[filled] = sums[filled] / counts[filled, None]
+    return cents
+
+
+def _encode(matrix, codebooks) -> np.ndarray:
+    m, _, dsub = codebooks.shape
+    codes = np.empty((len(matrix), m), dtype=np.uint8)
+    for start in range(0, len(matrix), _BLOCK):
+        block = np.asarray(matrix[start:start + _BLOCK], dtype=np.float32)
+        for j in range(m):
+            sub = block[:, j * dsub:(j + 1) * dsub]
+            cb = codebooks[j]
+            codes[start:start + len(block), j] = np.argmin((cb ** 2).sum(1) - 2 * sub @ cb.T, axis=1)
+    return codes
+
+
+class PQIndex:
+    def __init__(self, codebooks, codes, exact=None, rerank: int = RERANK_CANDIDATES):
+        self.codebooks = codebooks            # (m, ksub, dsub) float32
+        self.codes = codes                    # (n, m) uint8
+        self.exact = exact
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, matrix, m: int = PQ_SUBSPACES, exact=None, rerank: int = RERANK_CANDIDATES, seed: int = 0):
+        """`matrix` must be row-normalised; its dim must divide by `m`."""
+        n, dim = matrix.shape
+        if dim % m:
+            raise ValueError(f"dim {dim} is not divisible into {m} subspaces")
+        rng = np.random.default_rng(seed)
+        ksub = min(256, n)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, size=min(n, ksub * 40), replace=False))], dtype=np.float32)
+        dsub = dim // m
+        codebooks = np.stack([_train_codebook(sample[:, j * dsub:(j + 1) * dsub], ksub, PQ_ITERS, rng)
+                              for j in range(m)]).astype(np.float32)
+        return cls(codebooks, _encode(matrix, codebooks), exact, rerank)
+
+    def save(self, f) -> None:
+        np.savez(f, codebooks=self.codebooks, codes=self.codes)
+
+    @classmethod
+    def load(cls, path: str, exact=None, rerank: int = RERANK_CANDIDATES):
+        with np.load(path) as data:
+            return cls(data["codebooks"], data["codes"], exact, rerank)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.codebooks.nbytes
+
+    def scores(self, q) -> np.ndarray:
+        lut = self._lut(q)
+        out = np.empty(len(self), dtype=np.float32)
+        cols = np.arange(len(lut))
+        for start in range(0, len(self), _BLOCK):
+            block = self.codes[start:start + _BLOCK]
+            out[start:start + len(block)] = lut[cols, block].sum(axis=1)
+        return out
+
+    def _lut(self, q) -> np.ndarray:
+        m, _, dsub = self.codebooks.shape
+        return np.einsum("mkd,md->mk", self.codebooks, q.reshape(m, dsub))     # (m, ksub)
+
+    def search(self, q_vec, k, threshold=None):
+        q = unit_query(q_vec)
+        if q is None or not len(self) or k <= 0:
+            return EMPTY_RESULT
+        return _search(self, self.scores(q), None, q, k, threshold)
+
+    def search_rows(self, q, ids, k, threshold=None):
+        """search() over rows `ids` only; `q` must be unit length."""
+        lut = self._lut(q)
+        approx = lut[np.arange(len(lut)), self.codes[ids]].sum(axis=1)
+        return _search(self, approx, ids, q, k, threshold)
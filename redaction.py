@@ -0,0 +1,52 @@
+# ─── PII REDACTION ──────────────────────────────────────────
+#
+# Same result as the original eight sequential re.sub passes, in six
+# precompiled passes. Rules only share a pass where no match of one can
+# overlap a match of the other; everything else runs in the legacy order,
+# because a later rule must see the text *after* earlier replacements:
+#
+#   "Thanks, Dear Mr Smith"  – dear runs first, then signoff eats "Thanks, Dear"
+#   "123 4567 89@x.com"      – the email goes before the int'l number can take "89"
+#
+# Word rules are guarded by a cheap lookahead on their first character so
+# the engine gives up early at most word boundaries.
+#
+import re
+
+PII_PATTERNS = [
+    r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",                # emails
+    r"\b(?:\+44\s?7\d{3}|\(?07\d{3}\)?)\s?\d{3}\s?\d{3}\b",                # UK mobile
+    r"\b(?:\+44\s?1\d{3}|\(?01\d{3}\)?|\(?02\d{3}\)?)\s?\d{3}\s?\d{3,4}\b", # UK landline
+    r"\+?\d[\d\s\-().]{7,}\d",                                             # general int’l format
+    r"\b[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}\b",                               # UK postcode
+]
+
+_EMAIL    = r"[A-Za-z0-9._%+-]++@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"        # possessive: '@' is not in the class
+_MOBILE   = r"(?:\+44\s?7\d{3}|\(?07\d{3}\)?)\s?\d{3}\s?\d{3}\b"
+_LANDLINE = r"(?:\+44\s?1\d{3}|\(?01\d{3}\)?|\(?02\d{3}\)?)\s?\d{3}\s?\d{3,4}\b"
+_POSTCODE = r"[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}\b"
+# Intros like "My name is Mr Smith", "I'm Mrs Jones"
+_INTRO    = r"(?:my name is|i am|i’m|i’m called)\s+(?:mr\.?|mrs\.?|ms\.?|miss)?\s*[A-Z][a-z]+\b"
+# "Dear Mr Carter", "Dear Ms Jones"
+_DEAR     = r"Dear\s+(?:Mr\.?|Mrs\.?|Ms\.?|Miss)?\s*[A-Z][a-z]+\b"
+# Sign-offs like "Regards, John"
+_SIGNOFF  = r"(?:regards|thanks|thank you|sincerely|best wishes|kind regards)[,]?\s+[A-Z][a-z]+\b"
+
+# (pattern, replacement) in the legacy order
+_PASSES = [
+    (rf"\b{_EMAIL}", "[redacted]"),
+    (rf"\b(?=[+(0])(?:{_MOBILE}|{_LANDLINE})", "[redacted]"),          # distinct prefixes, never overlap
+    (PII_PATTERNS[3], "[redacted]"),
+    # a postcode needs a digit in its first word, an intro name has none
+    (rf"\b(?:(?=[A-Z])(?P<postcode>{_POSTCODE})|(?=[mi]){_INTRO})",
+     lambda m: "[redacted]" if m.group("postcode") else "my name is [redacted]"),
+    (rf"\b{_DEAR}", "Dear [redacted]"),
+    (rf"\b(?=[rtsbk]){_SIGNOFF}", "[redacted]"),
+]
+_PASSES = [(re.compile(pat, re.I), rep) for pat, rep in _PASSES]
+
+
+def remove_personal_info(text: str) -> str:
+    for pattern, rep in _PASSES:
+        text = pattern.sub(rep, text)
+    return text
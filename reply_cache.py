@@ -0,0 +1,51 @@
+# ─── FULL-REPLY CACHE ───────────────────────────────────────
+#
+# In-process LRU with a TTL. Keys are hashes over everything that shapes a
+# generated reply (see make_key), so a KB rebuild or a prompt edit changes
+# every key and stale replies simply stop being hit.
+#
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("REPLY_CACHE_SIZE", "512"))
+DEFAULT_TTL         = float(os.getenv("REPLY_CACHE_TTL", "3600"))
+
+
+def make_key(**parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ReplyCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires, value = hit
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,80 @@
+# ─── VECTOR RETRIEVAL ───────────────────────────────────────
+import numpy as np
+
+
+def normalise_rows(vectors) -> np.ndarray:
+    """Return a contiguous float32 copy of `vectors` with unit-length rows."""
+    mat = np.ascontiguousarray(vectors, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1) if mat.size else mat.reshape(0, 0)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(mat / norms, dtype=np.float32)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over a fixed set of embeddings.
+
+    Rows are normalised once at build time, so a query costs one
+    matrix-vector product plus an argpartition top-k.
+    """
+
+    def __init__(self, vectors=None, normalised=False):
+        if vectors is None or len(vectors) == 0:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        elif normalised:
+            self.matrix = np.asarray(vectors, dtype=np.float32)
+        else:
+            self.matrix = normalise_rows(vectors)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def add(self, vec):
+        """Append one embedding, or a matrix of them, to the index."""
+        row = normalise_rows(vec)
+        if not len(self):
+            self.matrix = row
+        else:
+            self.matrix = np.ascontiguousarray(np.vstack([self.matrix, row]))
+
+    def search(self, q_vec, k, threshold=None):
+        """
+        Return (scores, indices) of the `k` best rows, best first.
+        Rows scoring below `threshold` are dropped.
+        """
+        q = unit_query(q_vec)
+        if q is None or not len(self) or k <= 0:
+            return EMPTY_RESULT
+        return top_k(self.matrix @ q, k, threshold)
+
+
+EMPTY_RESULT = (np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.intp))
+
+
+def unit_query(q_vec):
+    """`q_vec` as a flat unit-length float32 vector, or None if it is all zeros."""
+    q = np.asarray(q_vec, dtype=np.float32).ravel()
+    q_norm = np.linalg.norm(q)
+    return q / q_norm if q_norm else None
+
+
+def top_k(scores, k, threshold=None):
+    """(scores, positions) of the `k` highest `scores`, best first, at or above `threshold`."""
+    k = min(k, len(scores))
+    if k < len(scores):
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    top = scores[idx]
+
+    if threshold is not None:
+        keep = top >= threshold
+        idx, top = idx[keep], top[keep]
+    return top, idx
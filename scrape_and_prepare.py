@@ -1,60 +1,47 @@
 import os
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import re
 import json
+import argparse
 
-BASE_URL = "https://www.bassetths.org.uk"
-VISITED = set()
-CRAWLED_DATA = []
+from crawler import Crawler
+from crawl_state import CrawlState, DEFAULT_PATH as STATE_PATH
+from page_store import JsonlWriter
 
-EXCLUDE_PATTERNS = ["wp-login", "login", "contact-form", "admin", "cookie", "feed", "rss", "mailto:", ".ics"]
+BASE_URL = "https://www.bassetths.org.uk"
+OUTPUT_PATH = "output/pages.jsonl"
+CHANGES_PATH = "output/changes.json"
 
-def is_valid_url(href):
-    if not href:
-        return False
-    parsed = urlparse(href)
-    if parsed.netloc and parsed.netloc != urlparse(BASE_URL).netloc:
-        return False
-    if href.startswith("javascript:") or any(x in href for x in EXCLUDE_PATTERNS):
-        return False
-    return True
+parser = argparse.ArgumentParser(description=f"Crawl school site(s) into {OUTPUT_PATH}")
+parser.add_argument("seeds", nargs="*", default=[BASE_URL], help="start URL(s); one per school site")
+parser.add_argument("--max-depth", type=int, default=2)
+parser.add_argument("--workers", type=int, default=8, help="pages fetched in parallel overall")
+parser.add_argument("--per-host", type=int, default=2, help="parallel requests per site")
+parser.add_argument("--delay", type=float, default=0.25, help="min seconds between requests to one site")
+parser.add_argument("--incremental", action="store_true",
+                    help=f"conditional requests against {STATE_PATH}; writes {CHANGES_PATH}")
+parser.add_argument("--resume", action="store_true",
+                    help="continue an interrupted crawl from its checkpointed frontier (implies --incremental)")
+args = parser.parse_args()
 
-def clean_text(soup):
-    for tag in soup(["script", "style", "header", "footer", "nav", "noscript", "iframe"]):
-        tag.decompose()
-    text = soup.get_text(separator=' ', strip=True)
-    return re.sub(r"\s+", " ", text)
+os.makedirs("output", exist_ok=True)
+state = CrawlState(STATE_PATH) if args.incremental or args.resume else None
+previous_urls = state.urls() if state else set()
 
-def crawl(url, depth=0, max_depth=2):
-    if url in VISITED or depth > max_depth:
-        return
-    try:
-        response = requests.get(url, timeout=10)
-        if not response.ok or "text/html" not in response.headers.get("Content-Type", ""):
-            return
-        soup = BeautifulSoup(response.text, "html.parser")
-        text = clean_text(soup)
-        if len(text) < 150:
-            return
-        CRAWLED_DATA.append({
-            "url": url,
-            "text": text,
-            "type": "html"
-        })
-        VISITED.add(url)
-        for link in soup.find_all("a", href=True):
-            abs_url = urljoin(url, link['href'].split('#')[0])
-            if is_valid_url(abs_url):
-                crawl(abs_url, depth + 1, max_depth)
-    except Exception as e:
-        print(f"⚠️ Failed to crawl {url}: {e}")
+# Crawl, writing each page as it arrives (OUTPUT_PATH.partial until the crawl completes)
+crawler = Crawler(args.seeds, max_depth=args.max_depth, workers=args.workers,
+                  per_host=args.per_host, delay=args.delay, state=state, resume=args.resume)
+with JsonlWriter(OUTPUT_PATH) as out:
+    for page in crawler.crawl():
+        out.write(page)
 
-# Crawl and save
-crawl(BASE_URL)
-os.makedirs("output", exist_ok=True)
-with open("output/clean_chunks.json", "w", encoding="utf-8") as f:
-    json.dump(CRAWLED_DATA, f, indent=2, ensure_ascii=False)
+print(f"✅ Saved {out.count} pages to {OUTPUT_PATH} ({len(crawler.attempted)} URLs attempted).")
 
-print(f"✅ Saved {len(CRAWLED_DATA)} pages.")
+if state:
+    # Change set for downstream chunking/embedding: only added/modified need work.
+    # Failed/skipped fetches keep their stored state; only gone or unlinked pages are removed.
+    removed = crawler.removed(previous_urls)
+    state.remove(removed)
+    state.close()
+    changes = {**{k: sorted(v) for k, v in crawler.changes.items()}, "removed": removed}
+    with open(CHANGES_PATH, "w", encoding="utf-8") as f:
+        json.dump(changes, f, indent=2)
+    print("🔁 Changes: " + ", ".join(f"{len(v)} {k}" for k, v in changes.items()))
@@ -0,0 +1,102 @@
+# ─── LOCAL SENTIMENT / STRATEGY CLASSIFIER ──────────────────
+#
+# Nearest-centroid model over the query embedding we already have, so the
+# sentiment step costs a couple of dot products instead of an LLM round
+# trip. Centroids are trained offline by train_sentiment.py from the
+# (question, score, strategy) pairs logged while running in LLM mode.
+#
+# The log holds (redacted) parent enquiries, so it is opt-in
+# (SENTIMENT_LOG=1) and stops growing at SENTIMENT_LOG_MAX_MB.
+#
+import os
+import json
+import numpy as np
+
+from retrieval import normalise_rows
+
+MODEL_PATH    = "sentiment_model.npz"
+LOG_PATH      = "logs/sentiment_log.jsonl"
+SCORE_TEMP    = 0.05   # softmax temperature over score-centroid similarities
+LOG_ENABLED   = os.getenv("SENTIMENT_LOG", "0") == "1"
+LOG_MAX_BYTES = int(os.getenv("SENTIMENT_LOG_MAX_MB", "20")) << 20
+
+# Curated reply strategies – the model picks one of these by index.
+STRATEGIES = [
+    "Thank them warmly, answer the question directly and invite them to visit or attend a Stay & Play.",
+    "Acknowledge the concern with empathy, reassure them and offer a call with the admissions team.",
+    "Give clear, factual admissions information and point to the relevant web page for next steps.",
+    "Explain the registration process step by step and encourage them to complete the form.",
+    "Share fee information transparently and offer to discuss payment options personally.",
+    "Apologise for any inconvenience, take ownership and set out exactly how it will be resolved.",
+    "Welcome their interest in a specific year group and explain entry points and availability.",
+    "Keep the reply brief and friendly, confirming the detail they asked for.",
+]
+
+
+class SentimentModel:
+    def __init__(self, score_labels, score_centroids, strategy_ids, strategy_centroids):
+        self.score_labels = np.asarray(score_labels, dtype=np.float32)
+        self.score_centroids = normalise_rows(score_centroids)
+        self.strategy_ids = np.asarray(strategy_ids, dtype=np.int64)
+        self.strategy_centroids = normalise_rows(strategy_centroids)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH):
+        with np.load(path, allow_pickle=False) as d:
+            return cls(d["score_labels"], d["score_centroids"], d["strategy_ids"], d["strategy_centroids"])
+
+    def save(self, path: str = MODEL_PATH) -> None:
+        np.savez(path, score_labels=self.score_labels, score_centroids=self.score_centroids,
+                 strategy_ids=self.strategy_ids, strategy_centroids=self.strategy_centroids)
+
+    @classmethod
+    def train(cls, q_vecs, scores, strategy_ids):
+        """Fit one centroid per observed score and per observed strategy."""
+        X = normalise_rows(q_vecs)
+        scores = np.asarray(scores)
+        strategy_ids = np.asarray(strategy_ids)
+        s_labels = np.unique(scores)
+        t_labels = np.unique(strategy_ids)
+        return cls(
+            s_labels, np.vstack([X[scores == s].mean(axis=0) for s in s_labels]),
+            t_labels, np.vstack([X[strategy_ids == t].mean(axis=0) for t in t_labels]),
+        )
+
+    def predict(self, q_vec):
+        """Return (score 1–10, strategy text)."""
+        q = np.asarray(q_vec, dtype=np.float32).ravel()
+        q = q / (np.linalg.norm(q) or 1.0)
+
+        sims = self.score_centroids @ q
+        w = np.exp((sims - sims.max()) / SCORE_TEMP)
+        score = int(np.clip(round(float(w @ self.score_labels / w.sum())), 1, 10))
+
+        strategy = STRATEGIES[int(self.strategy_ids[int(np.argmax(self.strategy_centroids @ q))])]
+        return score, strategy
+
+
+def load_model(path: str = MODEL_PATH):
+    """Return the trained model, or None if it has not been trained yet."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return SentimentModel.load(path)
+    except Exception as e:
+        print(f"⚠️ Could not load sentiment model: {e}")
+        return None
+
+
+def log_example(question: str, score: int, strategy: str, path: str = LOG_PATH,
+                enabled: bool = LOG_ENABLED, max_bytes: int = LOG_MAX_BYTES) -> None:
+    """Append an LLM-labelled example for the next training run, if logging is on and the log isn't full."""
+    if not enabled:
+        return
+    try:
+        if os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+            return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"question": question, "score": score, "strategy": strategy}) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not log sentiment example: {e}")
@@ -0,0 +1,74 @@
+# ─── STANDARD-RESPONSE EMBEDDING SIDECAR ────────────────────
+#
+# standard_responses.json  → templates (message + reply)
+# standard_responses.npz   → {"keys": entry hashes, "vectors": float32 rows}
+#
+# A worker only calls the embeddings API for entries whose hash is not in
+# the sidecar, and then in a single batched request. The sidecar is a
+# local cache (gitignored): a fresh checkout embeds the library once.
+#
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+
+def sidecar_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".npz"
+
+
+def entry_key(model: str, message: str) -> str:
+    return hashlib.sha256(f"{model}\0{message}".encode("utf-8")).hexdigest()
+
+
+def _read(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return dict(zip(data["keys"].tolist(), data["vectors"]))
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable template sidecar {path}: {e}")
+        return {}
+
+
+def _write(path: str, keys: list, vectors: list) -> None:
+    """Atomic replace via a temp file unique to this writer (workers save concurrently)."""
+    matrix = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".standard-", suffix=".tmp.npz")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, keys=np.array(keys, dtype=str), vectors=matrix)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_template_vectors(json_path: str, messages: list, model: str, embed_batch) -> np.ndarray:
+    """
+    Return one embedding row per message, reusing the sidecar where the
+    entry hash matches and embedding the rest with one `embed_batch` call.
+    """
+    path = sidecar_path(json_path)
+    keys = [entry_key(model, m) for m in messages]
+    stored = _read(path)
+
+    missing = list(dict.fromkeys(m for m, k in zip(messages, keys) if k not in stored))
+    if missing:
+        print(f"🔍 Embedding {len(missing)} new/changed template(s).")
+        for m, vec in zip(missing, embed_batch(missing)):
+            stored[entry_key(model, m)] = np.asarray(vec, dtype=np.float32)
+
+    if missing or set(stored) != set(keys):
+        _write(path, keys, [stored[k] for k in keys])
+
+    return np.vstack([stored[k] for k in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+
+def append_template_vector(json_path: str, model: str, message: str, vec) -> None:
+    """Record a freshly saved template's embedding in the sidecar."""
+    path = sidecar_path(json_path)
+    stored = _read(path)
+    stored[entry_key(model, message)] = np.asarray(vec, dtype=np.float32)
+    _write(path, list(stored), list(stored.values()))
@@ -0,0 +1,259 @@
+# ─── MULTI-TENANT KB REGISTRY ───────────────────────────────
+#
+# One process serves many schools. Each tenant (school) has its own KB
+# index and template library, loaded on first use and kept in an LRU.
+# When the estimated memory of loaded tenants exceeds the budget, the
+# least recently used ones are dropped (requests already holding a
+# Tenant keep it alive until they finish).
+#
+#   kb/<tenant>/kb_meta.json + vectors   – from build_kb.py
+#   kb/<tenant>/standard_responses.json  – that school's template replies
+#   kb/<tenant>/reply_prompt.txt         – that school's reply prompt (required)
+#   kb/<tenant>/url_mapping.json         – optional site anchors:
+#                                          {"URL_MAPPING": {…}, "URL_ALIASES": {…}}
+#
+# The default tenant keeps the single-school paths (KB_DIR, the pickle
+# fallback, ./standard_responses.json), the built-in prompt and
+# url_mapping.py. Those are Bassett House's, so no other tenant falls back
+# to them: without its own prompt a tenant does not load, and without its
+# own url_mapping.json it gets no site links.
+#
+import os
+import re
+import json
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+import metrics
+from retrieval import VectorIndex, normalise_rows
+from kb_index import META_FILE, index_exists, load_index, load_lexical
+from lexical import LexicalIndex
+from linker import resolve_anchors
+from quantized import KB_QUANTIZATION, Int8Index, quantized_index
+from two_stage import KB_TWO_STAGE, TwoStageIndex
+from template_store import append_template_vector, load_template_vectors
+
+TENANT_ROOT      = os.getenv("TENANT_ROOT", "kb")
+DEFAULT_TENANT   = os.getenv("DEFAULT_TENANT", "default")
+TENANT_MEMORY_MB = int(os.getenv("TENANT_MEMORY_MB", "1024"))
+# "parents.bassetths.org.uk=bassett;enquiries.other.sch.uk=other"
+TENANT_HOSTS     = dict(p.split("=", 1) for p in os.getenv("TENANT_HOSTS", "").split(";") if "=" in p)
+
+_VALID_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+class UnknownTenant(KeyError):
+    pass
+
+
+def file_digest(paths) -> str:
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()[:16]
+
+
+def resolve_tenant(body: dict, host: str = "") -> str:
+    """
+    Tenant from the request body ("tenant"/"school"), else the host name, else
+    the default. A malformed name in the body raises UnknownTenant.
+    """
+    name = body.get("tenant") or body.get("school")
+    if name:
+        if not isinstance(name, str) or not _VALID_NAME.match(name.strip().lower()):
+            raise UnknownTenant(str(name)[:64])
+        return name.strip().lower()
+    host = (host or "").split(":")[0].lower()
+    if host in TENANT_HOSTS:
+        return TENANT_HOSTS[host]
+    label = host.split(".")[0]
+    if _VALID_NAME.match(label) and os.path.isdir(os.path.join(TENANT_ROOT, label)):
+        return label
+    return DEFAULT_TENANT
+
+
+def load_kb(kb_dir: str, pickle_path: str = None):
+    """Return (index, lexical index, chunks, kb_version) from an index dir, or a legacy metadata.pkl."""
+    if index_exists(kb_dir):
+        index, chunks, meta = load_index(kb_dir)
+        # kb_meta.json names every (content-addressed) index file, so it alone
+        # versions the KB; hashing the vectors would page the whole mmap in
+        return index, load_lexical(kb_dir, meta, chunks), chunks, file_digest([os.path.join(kb_dir, META_FILE)])
+    if pickle_path and os.path.exists(pickle_path):
+        print(f"⚠️ No kb_meta.json index in {kb_dir}, falling back to {pickle_path}.")
+        with open(pickle_path, "rb") as f:
+            kb = pickle.load(f)
+        chunks = kb["metadata"]
+        index = quantized_index(kb["embeddings"], KB_QUANTIZATION)
+        if index is None:
+            vectors = normalise_rows(kb["embeddings"])
+            index = TwoStageIndex(vectors) if KB_TWO_STAGE else VectorIndex(vectors, normalised=True)
+        return (index, LexicalIndex.build([c.get("text", "") for c in chunks]),
+                chunks, file_digest([pickle_path]))
+    raise FileNotFoundError(f"No KB index in {kb_dir}")
+
+
+def load_tenant_config(base: str):
+    """→ (reply prompt, site anchors) for a non-default tenant's directory."""
+    prompt_path = os.path.join(base, "reply_prompt.txt")
+    if not os.path.exists(prompt_path):
+        raise FileNotFoundError(f"No {prompt_path}: every school needs its own reply prompt")
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        prompt = f.read()
+    anchors = {}
+    mapping_path = os.path.join(base, "url_mapping.json")
+    if os.path.exists(mapping_path):
+        with open(mapping_path, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+        anchors = resolve_anchors(mapping.get("URL_MAPPING", {}), mapping.get("URL_ALIASES", {}))
+    return prompt, anchors
+
+
+# ─── TEMPLATE LIBRARY ───────────────────────────────────────
+def template_index():
+    """Empty index in the KB's search mode (templates grow one at a time, so PQ stores them as int8)."""
+    if KB_QUANTIZATION not in ("", "none"):
+        return Int8Index()
+    return TwoStageIndex() if KB_TWO_STAGE else VectorIndex()
+
+
+class TemplateLibrary:
+    """A tenant's saved standard replies and the index over their (redacted) messages."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.messages, self.replies = [], []
+        self.index = template_index()
+        self._lock = threading.Lock()
+
+    def load(self, embed_texts, model: str, redact):
+        if not os.path.exists(self.path):
+            print(f"⚠️ No {self.path} found.")
+            return self
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+            msgs = [redact(entry["message"]) for entry in saved]
+            vecs = load_template_vectors(self.path, msgs, model, embed_texts)   # sidecar, batched misses
+            self.messages.extend(msgs)
+            self.replies.extend(entry["reply"] for entry in saved)   # reply already HTML-ised
+            if len(vecs):
+                self.index.add(vecs)
+            print(f"✅ Loaded {len(self.messages)} template replies from {self.path}.")
+        except Exception as e:
+            print(f"❌ Failed loading templates from {self.path}: {e}")
+        return self
+
+    def match(self, q_vec, threshold: float):
+        """→ (reply, score) of the closest template at or above `threshold`, or ("", 0.0)."""
+        scores, idxs = self.index.search(q_vec, 1, threshold)
+        if len(idxs):
+            return self.replies[int(idxs[0])], float(scores[0])
+        return "", 0.0
+
+    def add(self, message: str, reply: str, timestamp: str, embed_text, model: str, redact) -> None:
+        """Persist a new template and make it matchable, keyed exactly as load() will key it."""
+        with self._lock:
+            data = []
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            data.append({"timestamp": timestamp, "message": message, "reply": reply})
+            with open(self.path, "w") as f:
+                json.dump(data, f, indent=2)
+
+            msg_loaded = redact(message)
+            vec = embed_text(msg_loaded)
+            append_template_vector(self.path, model, msg_loaded, vec)
+            self.messages.append(msg_loaded)
+            self.replies.append(reply)          # before the index, so a hit always has its reply
+            self.index.add(vec)
+
+    def nbytes(self) -> int:
+        return self.index.nbytes + sum(len(m) + len(r) for m, r in zip(self.messages, self.replies))
+
+
+# ─── TENANTS ────────────────────────────────────────────────
+class Tenant:
+    def __init__(self, name, kb_index, lexical, chunks, kb_version, templates, prompt_template=None,
+                 site_anchors=None):
+        self.name = name
+        self.kb_index = kb_index
+        self.lexical = lexical
+        self.chunks = chunks
+        self.kb_version = kb_version
+        self.templates = templates
+        self.prompt_template = prompt_template
+        self.site_anchors = site_anchors or {}     # phrase → url, linked once per reply
+        self.nbytes = (kb_index.nbytes + (lexical.nbytes if lexical else 0) + templates.nbytes()
+                       + sum(len(c.get("text", "")) + len(c.get("url", "")) + 200 for c in chunks))
+
+
+def tenant_dir(name: str) -> str:
+    if not _VALID_NAME.match(name):
+        raise UnknownTenant(name)
+    path = os.path.join(TENANT_ROOT, name)
+    if not os.path.isdir(path):
+        raise UnknownTenant(name)
+    return path
+
+
+class TenantRegistry:
+    """Lazily loaded tenants, LRU-evicted once their total size exceeds `budget_bytes`."""
+
+    def __init__(self, load, budget_bytes: int = TENANT_MEMORY_MB << 20):
+        self._load = load                      # name -> Tenant (raises UnknownTenant)
+        self.budget = budget_bytes
+        self._tenants = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Tenant:
+        with self._lock:
+            tenant = self._hit(name)
+            if tenant:
+                return tenant
+            loading = self._loading.setdefault(name, threading.Lock())
+
+        with loading:                          # one load per tenant; others wait for it
+            with self._lock:
+                tenant = self._hit(name)
+                if tenant:
+                    return tenant
+            try:
+                tenant = self._load(name)
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)     # also when the name is unknown
+            with self._lock:
+                self._tenants[name] = tenant
+                metrics.incr("tenants.loaded")
+                print(f"✅ Tenant '{name}' loaded ({tenant.nbytes >> 20} MB est.)")
+                self._evict(keep=name)
+        return tenant
+
+    def _hit(self, name):
+        tenant = self._tenants.get(name)
+        if tenant:
+            self._tenants.move_to_end(name)
+        return tenant
+
+    def _evict(self, keep: str) -> None:
+        while self.nbytes() > self.budget and len(self._tenants) > 1:
+            name = next(iter(self._tenants))
+            if name == keep:
+                break
+            self._tenants.pop(name)
+            metrics.incr("tenants.evicted")
+            print(f"🧹 Tenant '{name}' evicted (memory budget {self.budget >> 20} MB)")
+
+    def nbytes(self) -> int:
+        return sum(t.nbytes for t in self._tenants.values())
+
+    def names(self) -> list:
+        with self._lock:
+            return list(self._tenants)
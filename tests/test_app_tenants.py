@@ -0,0 +1,61 @@
+import os
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+app = pytest.importorskip("app")
+
+import tenants
+from kb_index import save_index
+
+REPLY_MD = "Dear Parent,\n\nPlease see our Admissions and Fees pages, or come to Visit Us.\n\nKind regards"
+OTHER = {"Admissions": "https://www.other.sch.uk/admissions/", "Fees": "https://www.other.sch.uk/fees/"}
+
+
+@pytest.fixture
+def other_school(tmp_path, monkeypatch):
+    monkeypatch.setattr(tenants, "TENANT_ROOT", str(tmp_path))
+    base = tmp_path / "other"
+    save_index(str(base), np.eye(2, 8, dtype=np.float32),
+               [{"text": "Fees at Other School", "url": OTHER["Fees"]},
+                {"text": "Admissions at Other School", "url": OTHER["Admissions"]}], ann=False, pq=False)
+    (base / "reply_prompt.txt").write_text("You write for Other School.\n{today_date}\n{question}\n{top_context}")
+    return base
+
+
+def test_other_tenant_never_links_bassett_house(other_school):
+    tenant = app.load_tenant("other")
+    reply = app.finalise_reply(REPLY_MD, {}, tenant)["reply"]
+    assert "bassetths.org.uk" not in reply and "<a " not in reply
+
+    (other_school / "url_mapping.json").write_text(json.dumps({"URL_MAPPING": OTHER,
+                                                               "URL_ALIASES": {"fees page": "Fees"}}))
+    tenant = app.load_tenant("other")
+    out = app.finalise_reply(REPLY_MD, {}, tenant)
+    assert "bassetths.org.uk" not in out["reply"]
+    assert out["url"] == OTHER["Admissions"] and f'href="{OTHER["Fees"]}"' in out["reply"]
+
+
+def test_default_tenant_keeps_the_bassett_house_links():
+    tenant = SimpleNamespace(site_anchors=app.site_anchors())
+    assert "bassetths.org.uk/admissions/" in app.finalise_reply(REPLY_MD, {}, tenant)["url"]
+
+
+def test_revise_links_with_the_requesting_tenant(other_school, monkeypatch):
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=REPLY_MD))])
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: completion)))
+    monkeypatch.setattr(app, "client", fake)
+    monkeypatch.setattr(app, "tenants", tenants.TenantRegistry(app.load_tenant))
+
+    res = app.app.test_client().post("/revise", json={
+        "tenant": "other", "message": "What are the fees?", "previous_reply": "Dear Parent", "instruction": "shorter"})
+    assert res.status_code == 200 and "bassetths.org.uk" not in res.get_json()["reply"]
+
+
+def test_tenant_without_its_own_prompt_does_not_load(other_school):
+    (other_school / "reply_prompt.txt").unlink()
+    with pytest.raises(FileNotFoundError, match="reply_prompt.txt"):
+        app.load_tenant("other")
@@ -0,0 +1,25 @@
+import re
+
+import numpy as np
+import pytest
+
+from build_kb import validate_kb
+
+CHUNKS = [{"text": "Fees for 2025", "url": "https://x/fees"}, {"text": "Visit us", "url": "https://x/visit"}]
+
+
+def test_valid_kb_passes():
+    validate_kb(np.ones((2, 4), dtype=np.float32), CHUNKS, "kb/x", dim=4)
+
+
+@pytest.mark.parametrize("vectors, chunks, problem", [
+    (np.ones((2, 3), dtype=np.float32), CHUNKS, "expected (n, 4)"),
+    (np.ones((1, 4), dtype=np.float32), CHUNKS, "1 vectors but 2 chunks"),
+    (np.array([[1, 0, 0, 0], [np.nan, 0, 0, 0]], dtype=np.float32), CHUNKS, "not finite"),
+    (np.array([[1, 0, 0, 0], [0, 0, 0, 0]], dtype=np.float32), CHUNKS, "all zero"),
+    (np.ones((2, 4), dtype=np.float32), [CHUNKS[0], {"text": "", "url": "https://x"}], "without text"),
+    (np.zeros((0, 4), dtype=np.float32), [], "no chunks"),
+])
+def test_invalid_kb_is_rejected(vectors, chunks, problem):
+    with pytest.raises(ValueError, match=re.escape(problem)):
+        validate_kb(vectors, chunks, "kb/x", dim=4)
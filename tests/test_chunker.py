@@ -0,0 +1,71 @@
+import pytest
+
+import chunker
+from chunker import chunk_pages, chunk_spans, count_tokens, sentence_spans
+
+PROSE = " ".join(f"Sentence number {i} talks about admissions, fees and the Reception year." for i in range(60))
+
+
+@pytest.mark.parametrize("text", [
+    PROSE,
+    "word " * 2000,                                   # one huge 'sentence'
+    "x" * 5000,                                       # no whitespace at all
+    "0123456789 " * 400 + ". Short one.",             # dense tokens
+])
+def test_no_span_or_chunk_exceeds_the_budget(text):
+    for start, end, tokens in sentence_spans(text, 200):
+        assert tokens == count_tokens(text[start:end]) <= 200
+    for start, end in chunk_spans(text, 200, 40):
+        assert count_tokens(text[start:end]) <= 200
+
+
+def test_long_text_split_at_whitespace_keeps_every_word():
+    text = "word " * 2000
+    pieces = [text[s:e] for s, e, _ in sentence_spans(text, 200)]
+    assert all(p == p.strip() for p in pieces)
+    assert sum(p.count("word") for p in pieces) == 2000
+
+
+def test_consecutive_chunks_overlap_and_cover_the_page():
+    spans = list(chunk_spans(PROSE, 200, 40))
+    assert len(spans) > 1
+    assert spans[0][0] == 0 and spans[-1][1] == len(PROSE)
+    for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+        assert start < prev_end                        # shares trailing sentences
+
+
+def test_chunk_pages_skips_short_pages_and_slices_text():
+    pages = [{"url": "https://x/a", "text": PROSE}, {"url": "https://x/b", "text": "Too short."}]
+    chunks = list(chunk_pages(pages, 200, 40))
+    assert {c["url"] for c in chunks} == {"https://x/a"}
+    assert all(PROSE[c["start"]:c["end"]] == c["text"] for c in chunks)
+
+
+@pytest.mark.parametrize("kb", [100, 400])
+def test_tokenizer_work_is_linear_on_unpunctuated_pages(monkeypatch, kb):
+    counted = []
+
+    def counting(text):
+        counted.append(len(text))
+        return chunker.estimate_tokens(text)
+
+    monkeypatch.setattr(chunker, "count_tokens", counting)
+    text = "lorem ipsum dolor sit amet consectetur " * (kb * 1024 // 39)
+    spans = list(chunk_spans(text, 200, 40))
+    assert spans[-1][1] == len(text.rstrip())
+    assert sum(counted) < 3 * len(text)               # was 64× (100 KB) and 253× (400 KB)
+
+
+class OneTokenPerWord:
+    """Stand-in for a tiktoken Encoding."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+def test_an_encoder_counts_tokens_when_available(monkeypatch):
+    monkeypatch.setattr(chunker, "_ENCODING", OneTokenPerWord())
+    text = "supercalifragilistic " * 1000                   # 21 chars a word: far under chars/4
+    assert count_tokens(text) == 1000
+    for start, end, tokens in sentence_spans(text, 200):
+        assert tokens == len(text[start:end].split()) <= 200
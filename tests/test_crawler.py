@@ -0,0 +1,220 @@
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from crawler import Crawler
+from crawl_state import CrawlState
+
+BODY = "Admissions information about our school, its fees, open mornings and the Reception year. " * 3
+
+
+def html(*links, text=BODY):
+    return "<html><body><p>" + text + "</p>" + "".join(f'<a href="{href}">x</a>' for href in links) + "</body></html>"
+
+
+class Site:
+    """Local HTTP fixture: `pages` maps path -> (status, html); counts hits and peak concurrency."""
+
+    def __init__(self, pages, latency: float = 0.02):
+        self.pages = pages
+        self.latency = latency
+        self.slow = {}                    # path -> seconds, to force client timeouts
+        self.validators = {}              # path -> {"ETag": …} / {"Last-Modified": …}; a match is a 304
+        self.hits = Counter()
+        self.not_modified = Counter()
+        self.inflight = self.peak = 0
+        self._lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with site._lock:
+                    site.hits[self.path] += 1
+                    site.inflight += 1
+                    site.peak = max(site.peak, site.inflight)
+                try:
+                    time.sleep(site.slow.get(self.path, site.latency))
+                    validators = site.validators.get(self.path, {})
+                    if ((validators.get("ETag") and self.headers["If-None-Match"] == validators["ETag"]) or
+                            (validators.get("Last-Modified")
+                             and self.headers["If-Modified-Since"] == validators["Last-Modified"])):
+                        site.not_modified[self.path] += 1
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                    status, body = site.pages.get(self.path, (404, "not found"))
+                    data = body.encode("utf-8")
+                    self.send_response(status)
+                    for name, value in validators.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with site._lock:
+                        site.inflight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def url(self, path: str) -> str:
+        return self.base + path
+
+
+@pytest.fixture
+def make_site():
+    sites = []
+
+    def make(pages, **kw):
+        sites.append(Site(pages, **kw))
+        return sites[-1]
+
+    yield make
+    for site in sites:
+        site.server.shutdown()
+        site.server.server_close()
+
+
+def crawl(site, path="/", **kw):
+    crawler = Crawler(site.url(path), delay=0, **kw)
+    return crawler, {p["url"] for p in crawler.crawl()}
+
+
+# ─── incremental crawl: what counts as removed ───
+def test_failed_fetches_keep_their_stored_page(make_site, tmp_path):
+    site = make_site({
+        "/": (200, html("/flaky", "/slow", "/retired", "/unlinked")),
+        "/flaky": (200, html()), "/slow": (200, html()), "/retired": (200, html()), "/unlinked": (200, html()),
+    })
+    state = CrawlState(str(tmp_path / "state.sqlite"))
+    try:
+        crawl(site, state=state)
+        previous = state.urls()
+        assert len(previous) == 5
+
+        site.pages["/"] = (200, html("/flaky", "/slow", "/retired"))
+        site.pages["/flaky"] = (503, "busy")
+        site.pages["/retired"] = (410, "gone")
+        site.slow["/slow"] = 1.0
+        crawler, emitted = crawl(site, state=state, timeout=0.3)
+
+        assert crawler.removed(previous) == [site.url("/retired"), site.url("/unlinked")]
+        # the 503 and the timeout are re-emitted from the stored copy
+        assert {site.url("/flaky"), site.url("/slow")} <= emitted
+        assert state.get(site.url("/flaky")) and state.get(site.url("/slow"))
+    finally:
+        state.close()
+
+
+def test_failed_fetch_without_a_stored_copy_is_not_emitted(make_site):
+    site = make_site({"/": (200, html("/down")), "/down": (500, "error")})
+    crawler, emitted = crawl(site)
+    assert emitted == {site.url("/")}
+    assert not crawler.gone
+
+
+def test_unmodified_pages_come_back_304_and_are_emitted_from_the_store(make_site, tmp_path):
+    site = make_site({"/": (200, html("/etag", "/dated", "/edited")),
+                      "/etag": (200, html()), "/dated": (200, html()), "/edited": (200, html())})
+    site.validators = {"/etag": {"ETag": '"v1"'},
+                       "/dated": {"Last-Modified": "Mon, 06 Oct 2025 09:00:00 GMT"},
+                       "/edited": {"ETag": '"e1"'}}
+    state = CrawlState(str(tmp_path / "state.sqlite"))
+    try:
+        crawler, _ = crawl(site, state=state)
+        assert len(crawler.changes["added"]) == 4 and not site.not_modified
+
+        site.pages["/edited"] = (200, html(text=BODY + " Now with a new Reception class."))
+        site.validators["/edited"] = {"ETag": '"e2"'}
+        crawler, emitted = crawl(site, state=state)
+
+        assert site.not_modified == {"/etag": 1, "/dated": 1}
+        assert sorted(crawler.changes["unchanged"]) == [site.url("/"), site.url("/dated"), site.url("/etag")]
+        assert crawler.changes["modified"] == [site.url("/edited")] and not crawler.changes["added"]
+        assert len(emitted) == 4                            # 304 pages are still emitted
+    finally:
+        state.close()
+
+
+# ─── resume ───
+def test_resume_after_an_interrupted_crawl_keeps_new_pages_added(make_site, tmp_path):
+    pages = {"/": (200, html(*(f"/p{i}" for i in range(16))))}
+    pages.update({f"/p{i}": (200, html()) for i in range(16)})
+    site = make_site(pages, latency=0.05)
+    state = CrawlState(str(tmp_path / "state.sqlite"))
+    try:
+        first = Crawler(site.url("/"), delay=0, workers=8, per_host=8, state=state).crawl()
+        finished = {next(first)["url"] for _ in range(3)}
+        first.close()                 # dies here; the fetches in flight still land in the store
+        in_flight = state.urls() - finished
+        assert in_flight
+
+        crawler = Crawler(site.url("/"), delay=0, workers=8, per_host=8, state=state, resume=True)
+        emitted = {p["url"] for p in crawler.crawl()}
+
+        assert emitted == {site.url(p) for p in pages}
+        assert sorted(crawler.changes["added"]) == sorted(emitted)
+        assert not crawler.changes["unchanged"] and not crawler.changes["modified"]
+        assert all(site.hits[url[len(site.base):]] == 1 for url in finished)    # not fetched again
+    finally:
+        state.close()
+
+
+def test_resume_of_a_recrawl_still_sees_unchanged_pages(make_site, tmp_path):
+    site = make_site({"/": (200, html("/a")), "/a": (200, html())})
+    state = CrawlState(str(tmp_path / "state.sqlite"))
+    try:
+        crawl(site, state=state)
+        second = Crawler(site.url("/"), delay=0, state=state).crawl()
+        next(second)
+        second.close()
+
+        crawler = Crawler(site.url("/"), delay=0, state=state, resume=True)
+        list(crawler.crawl())
+        assert sorted(crawler.changes["unchanged"]) == [site.url("/"), site.url("/a")]
+    finally:
+        state.close()
+
+
+# ─── fetching: dedup, per-host limits ───
+def test_each_url_is_fetched_once(make_site):
+    pages = {"/": (200, html(*(f"/p{i}" for i in range(10))))}
+    for i in range(10):
+        # every page links to every other, with and without fragments, plus a short and a failing page
+        pages[f"/p{i}"] = (200, html(*(f"/p{j}#top" for j in range(10)), "/", "/short", "/broken"))
+    pages["/short"] = (200, html("/p1", text="too short"))
+    pages["/broken"] = (500, "error")
+    site = make_site(pages)
+
+    _, emitted = crawl(site, max_depth=3, workers=8)
+
+    assert emitted == {site.url("/")} | {site.url(f"/p{i}") for i in range(10)}
+    assert set(site.hits.values()) == {1}                      # no refetch, short and failed pages included
+    assert site.hits["/short"] == site.hits["/broken"] == 1
+
+
+def test_external_and_excluded_links_are_not_followed(make_site):
+    site = make_site({"/": (200, html("/wp-login", "/admin/x", "https://example.com/", "mailto:a@b.com"))})
+    crawl(site)
+    assert set(site.hits) == {"/"}
+
+
+@pytest.mark.parametrize("per_host", [1, 2])
+def test_per_host_concurrency_is_capped(make_site, per_host):
+    pages = {"/": (200, html(*(f"/p{i}" for i in range(12))))}
+    pages.update({f"/p{i}": (200, html()) for i in range(12)})
+    site = make_site(pages, latency=0.05)
+
+    crawl(site, workers=8, per_host=per_host)
+
+    assert site.peak == per_host
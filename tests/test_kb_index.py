@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from ann import IVFIndex
+from kb_index import load_index, save_index
+from quantized import Int8Index, PQIndex
+from retrieval import VectorIndex, normalise_rows
+
+
+@pytest.fixture(scope="module")
+def ivf_kb(tmp_path_factory):
+    """A KB big enough to matter, saved with IVF lists and int8 + PQ codes."""
+    rng = np.random.default_rng(0)
+    topics = rng.standard_normal((40, 192), dtype=np.float32)
+    rows = topics[rng.integers(0, 40, 3000)] + 0.5 * rng.standard_normal((3000, 192), dtype=np.float32)
+    directory = str(tmp_path_factory.mktemp("kb"))
+    save_index(directory, rows, [{"text": f"chunk {i}"} for i in range(len(rows))], ann=True, pq=True)
+    queries = normalise_rows(rows[rng.integers(0, len(rows), 50)]
+                             + 0.3 * rng.standard_normal((50, 192), dtype=np.float32))
+    return directory, queries
+
+
+@pytest.mark.parametrize("mode, codes", [("int8", Int8Index), ("pq", PQIndex)])
+def test_ivf_kbs_score_from_quantized_codes(ivf_kb, mode, codes):
+    directory, queries = ivf_kb
+    plain, _, _ = load_index(directory, quantization="none", two_stage=False)
+    index, _, _ = load_index(directory, quantization=mode, two_stage=False)
+
+    assert isinstance(index, IVFIndex) and isinstance(index.quantized, codes)
+    assert index.nbytes * 3 <= plain.nbytes                       # what the tenant budget sees
+
+    exact = VectorIndex(np.asarray(plain.matrix), normalised=True)
+    for q in queries:
+        # with every list probed, re-ranked codes give exact search's top 3, in order
+        assert list(index.search(q, 3, nprobe=index.nlist)[1]) == list(exact.search(q, 3)[1])
+        assert list(index.search(q, 3)[1]) == list(plain.search(q, 3)[1])
+
+
+def test_ivf_kbs_without_quantization_keep_scoring_the_matrix(ivf_kb):
+    directory, _ = ivf_kb
+    index, _, _ = load_index(directory, quantization="none", two_stage=False)
+    assert isinstance(index, IVFIndex) and index.quantized is None
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+from kb_index import load_index, load_lexical
+from lexical import hybrid_search, index_terms, tokenize
+from retrieval import VectorIndex
+
+KB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embeddings")
+
+
+@pytest.fixture(scope="module")
+def kb():
+    index, chunks, meta = load_index(KB_DIR, quantization="none", two_stage=False)
+    return index, load_lexical(KB_DIR, meta, chunks), chunks
+
+
+def test_tokenize_keeps_plus_and_drops_stopwords():
+    assert tokenize("Is the 11+ exam hard?") == ["11+", "exam", "hard"]
+
+
+def test_index_terms_add_word_pairs():
+    assert index_terms("Year of Entry Calculator") == ["year", "entry", "calculator", "year entry", "entry calculator"]
+
+
+# what /reply actually searches with: the whole redacted email
+ELEVEN_PLUS = ("Dear [redacted], I am writing to ask whether my daughter could sit the 11+ assessment next year. "
+               "She is currently in Year 5 at a state primary. Many thanks, [redacted]")
+CALCULATOR = ("Dear [redacted], We are moving to London in the summer and I used your Year Of Entry Calculator "
+              "but I'm not sure which year group my son would join. Could you help? Best wishes")
+STAY_AND_PLAY = ("Dear admissions, Do you offer a stay and play session for nursery children? "
+                 "We would love to visit. Kind regards")
+OFF_TOPIC = [
+    "Hi, I was wondering whether you could sell me some second hand cars for the family. "
+    "My husband needs one for work next month. Regards",
+    "Dear Sir, I would like to enquire about renting your hall for a birthday party for my son next weekend, "
+    "is this possible? Thank you",
+    "Good morning, please remove me from your mailing list, I no longer wish to receive emails. Thank you",
+]
+PADDING = " We have heard wonderful things about the school from friends and neighbours." * 5
+
+
+@pytest.mark.parametrize("query, phrase", [
+    ("11+", "11+"),
+    ("Year Of Entry Calculator", "year of entry calculator"),
+    (ELEVEN_PLUS, "11+"),
+    (CALCULATOR, "year of entry calculator"),
+    (STAY_AND_PLAY, "stay and play"),
+])
+def test_exact_term_enquiries_are_lexical_hits(kb, query, phrase):
+    _, lexical, chunks = kb
+    _, idx = lexical.search(query, 3, key_idf=1.0)
+    assert len(idx)
+    assert phrase in chunks[idx[0]]["text"].lower()
+
+
+@pytest.mark.parametrize("query", [ELEVEN_PLUS, CALCULATOR])
+def test_the_gate_does_not_depend_on_email_length(kb, query):
+    _, lexical, _ = kb
+    short = set(lexical.search(query, 50, key_idf=1.0)[1])
+    assert short and set(lexical.search(query + PADDING, 50, key_idf=1.0)[1]) == short
+
+
+@pytest.mark.parametrize("query", OFF_TOPIC)
+def test_off_topic_emails_are_not_lexical_hits(kb, query):
+    _, lexical, _ = kb
+    assert len(lexical.search(query, 3)[1])                         # shares some words with the KB...
+    assert not len(lexical.search(query, 3, key_idf=1.0)[1])        # ...but no key term
+
+
+def test_hybrid_search_adds_only_gated_lexical_hits(kb):
+    index, lexical, _ = kb
+    no_vector_hits = np.zeros(index.matrix.shape[1], dtype=np.float32)
+    assert len(hybrid_search(index, lexical, no_vector_hits, ELEVEN_PLUS, 3, 0.5)[1])
+    assert len(hybrid_search(index, lexical, no_vector_hits, CALCULATOR, 3, 0.5)[1])
+    for query in OFF_TOPIC:
+        assert not len(hybrid_search(index, lexical, no_vector_hits, query, 3, 0.5)[1])
+    assert not len(hybrid_search(VectorIndex(), None, no_vector_hits, "11+", 3, 0.5)[1])
@@ -0,0 +1,69 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import Finish, Stage, run_stages
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(4) as executor:
+        yield executor
+
+
+def test_results_flow_to_dependent_stages(pool):
+    stages = [
+        Stage("a", lambda: 2),
+        Stage("b", lambda: 3),
+        Stage("sum", lambda a, b: a + b, after=("a", "b")),
+    ]
+    assert run_stages(stages, pool) == (False, {"a": 2, "b": 3, "sum": 5})
+
+
+def test_independent_stages_run_concurrently(pool):
+    barrier = threading.Barrier(2, timeout=2)
+    stages = [Stage("a", barrier.wait), Stage("b", barrier.wait)]    # deadlocks (BrokenBarrierError) if serial
+    assert sorted(run_stages(stages, pool)[1].values()) == [0, 1]
+
+
+def test_finish_short_circuits_and_skips_later_stages(pool):
+    ran = []
+    stages = [
+        Stage("match", lambda: Finish("template reply")),
+        Stage("reply", lambda match: ran.append("reply"), after=("match",)),
+    ]
+    assert run_stages(stages, pool) == (True, "template reply")
+    assert ran == []
+
+
+def test_finish_does_not_wait_for_running_siblings(pool):
+    release = threading.Event()
+    stages = [Stage("slow", lambda: release.wait(2)), Stage("match", lambda: Finish("hit"))]
+    t0 = time.monotonic()
+    assert run_stages(stages, pool) == (True, "hit")
+    assert time.monotonic() - t0 < 1
+    release.set()
+
+
+def test_exceptions_propagate_and_dependents_never_run(pool):
+    ran = []
+
+    def boom():
+        raise RuntimeError("embedding failed")
+
+    stages = [
+        Stage("embed", boom),
+        Stage("retrieve", lambda embed: ran.append("retrieve"), after=("embed",)),
+    ]
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        run_stages(stages, pool)
+    assert ran == []
+
+
+def test_cycles_and_unknown_dependencies_are_rejected(pool):
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages([Stage("a", lambda b: b, after=("b",)), Stage("b", lambda a: a, after=("a",))], pool)
+    with pytest.raises(ValueError, match="unknown"):
+        run_stages([Stage("a", lambda x: x, after=("x",))], pool)
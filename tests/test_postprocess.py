@@ -0,0 +1,15 @@
+import pytest
+
+from postprocess import clean_gpt_email_output
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("```markdown\nDear Parent,\n\nThanks.\n```", "Dear Parent,\n\nThanks."),
+    ("markdown: Dear Parent,", "Dear Parent,"),
+    ("Subject: Your enquiry\n\nDear Parent,", "Dear Parent,"),
+    ("```\nSubject: Fees\nDear Parent,\n```", "Dear Parent,"),
+    ("Dear Parent,\nSubject: Maths is taught daily in Year 3.", "Dear Parent,\nSubject: Maths is taught daily in Year 3."),
+    ("Dear Parent,\n\nMarkdown: we also teach coding.", "Dear Parent,\n\nMarkdown: we also teach coding."),
+])
+def test_clean_only_strips_the_top_of_the_reply(raw, expected):
+    assert clean_gpt_email_output(raw) == expected
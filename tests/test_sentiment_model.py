@@ -0,0 +1,27 @@
+import json
+
+import numpy as np
+
+from sentiment_model import STRATEGIES, SentimentModel, log_example
+
+
+def test_logging_is_off_unless_enabled(tmp_path):
+    path = tmp_path / "log.jsonl"
+    log_example("fees?", 7, STRATEGIES[0], path=str(path), enabled=False)
+    assert not path.exists()
+
+
+def test_log_stops_growing_at_the_cap(tmp_path):
+    path = tmp_path / "log.jsonl"
+    for i in range(50):
+        log_example(f"question {i}", 5, STRATEGIES[0], path=str(path), enabled=True, max_bytes=500)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert 0 < len(lines) < 50
+    assert path.stat().st_size < 500 + 200
+    assert json.loads(lines[0])["question"] == "question 0"
+
+
+def test_nearest_centroid_prediction():
+    x = np.eye(4, dtype=np.float32)
+    model = SentimentModel.train(x, scores=[2, 2, 9, 9], strategy_ids=[0, 0, 3, 3])
+    assert model.predict(x[3]) == (9, STRATEGIES[3])
@@ -0,0 +1,35 @@
+import os
+import threading
+
+import numpy as np
+
+from template_store import append_template_vector, load_template_vectors, sidecar_path
+
+
+def fake_embed(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return [np.full(4, len(t), dtype=np.float32) for t in texts]
+    return embed
+
+
+def test_sidecar_reuses_vectors_and_embeds_only_new_messages(tmp_path):
+    path = str(tmp_path / "standard_responses.json")
+    calls = []
+    first = load_template_vectors(path, ["fees?", "open day?"], "m", fake_embed(calls))
+    again = load_template_vectors(path, ["fees?", "open day?", "bus?"], "m", fake_embed(calls))
+    assert calls == [["fees?", "open day?"], ["bus?"]]
+    assert np.array_equal(again[:2], first)
+    assert load_template_vectors(path, ["fees?"], "other-model", fake_embed(calls)).shape == (1, 4)
+    assert calls[-1] == ["fees?"]
+
+
+def test_concurrent_writers_leave_no_temp_files(tmp_path):
+    path = str(tmp_path / "standard_responses.json")
+    threads = [threading.Thread(target=append_template_vector, args=(path, "m", f"msg {i}", np.ones(4)))
+               for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert os.listdir(tmp_path) == [os.path.basename(sidecar_path(path))]
@@ -0,0 +1,44 @@
+import pytest
+
+from tenants import DEFAULT_TENANT, TenantRegistry, UnknownTenant, resolve_tenant
+
+
+class FakeTenant:
+    def __init__(self, name, nbytes=100):
+        self.name, self.nbytes = name, nbytes
+
+
+@pytest.mark.parametrize("body, expected", [
+    ({"tenant": " Bassett "}, "bassett"),
+    ({"school": "other-school"}, "other-school"),
+    ({}, DEFAULT_TENANT),
+    ({"tenant": ""}, DEFAULT_TENANT),
+])
+def test_resolve_tenant(body, expected):
+    assert resolve_tenant(body, "localhost:5000") == expected
+
+
+@pytest.mark.parametrize("bad", [123, ["bassett"], {"a": 1}, "../etc", "a" * 80, "two words"])
+def test_malformed_tenant_names_are_unknown(bad):
+    with pytest.raises(UnknownTenant):
+        resolve_tenant({"tenant": bad})
+
+
+def test_failed_loads_leave_nothing_behind():
+    def load(name):
+        raise UnknownTenant(name)
+
+    registry = TenantRegistry(load)
+    for i in range(50):
+        with pytest.raises(UnknownTenant):
+            registry.get(f"nope{i}")
+    assert registry.names() == [] and registry._loading == {}
+
+
+def test_least_recently_used_tenant_is_evicted():
+    registry = TenantRegistry(FakeTenant, budget_bytes=250)
+    a = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is a                 # hit, now most recent
+    registry.get("c")
+    assert registry.names() == ["a", "c"]
@@ -0,0 +1,48 @@
+import os
+import json
+import numpy as np
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from embed_cache import EmbeddingCache, embed_with_cache
+from retrieval import normalise_rows
+from sentiment_model import LOG_PATH, MODEL_PATH, STRATEGIES, SentimentModel
+
+# Trains the local sentiment/strategy model (sentiment_model.npz) from the
+# examples app.py logs while SENTIMENT_MODE=llm.
+
+load_dotenv()
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+EMBED_MODEL = "text-embedding-3-small"
+MIN_EXAMPLES = 20
+
+if not os.path.exists(LOG_PATH):
+    raise FileNotFoundError(f"{LOG_PATH} not found. Run the app with SENTIMENT_MODE=llm SENTIMENT_LOG=1 first.")
+
+with open(LOG_PATH, "r", encoding="utf-8") as f:
+    examples = [json.loads(line) for line in f if line.strip()]
+
+if len(examples) < MIN_EXAMPLES:
+    raise SystemExit(f"Only {len(examples)} logged examples – need at least {MIN_EXAMPLES}.")
+
+cache = EmbeddingCache()
+
+def embed(texts):
+    def create(batch):
+        return [d.embedding for d in client.embeddings.create(model=EMBED_MODEL, input=batch).data]
+    return np.vstack(embed_with_cache(texts, EMBED_MODEL, create, cache))
+
+print(f"🔍 Embedding {len(examples)} logged enquiries...")
+q_vecs = embed([e["question"] for e in examples])
+scores = [int(np.clip(int(e["score"]), 1, 10)) for e in examples]
+
+# Map each free-text LLM strategy onto the nearest curated strategy
+curated = normalise_rows(embed(STRATEGIES))
+logged = normalise_rows(embed([e["strategy"] or STRATEGIES[0] for e in examples]))
+strategy_ids = np.argmax(logged @ curated.T, axis=1)
+
+model = SentimentModel.train(q_vecs, scores, strategy_ids)
+model.save(MODEL_PATH)
+
+print(f"✅ Saved {MODEL_PATH}: {len(model.score_labels)} score centroids, "
+      f"{len(model.strategy_ids)} of {len(STRATEGIES)} strategies seen.")
@@ -0,0 +1,63 @@
+# ─── TWO-STAGE (COARSE-TO-FINE) SEARCH ──────────────────────
+#
+# text-embedding-3 vectors are trained so that a prefix of the dimensions
+# (re-normalised) is still a usable embedding. Stage one scores a small,
+# contiguous in-memory matrix of the first `prefix_dim` dims to shortlist
+# `shortlist` rows; stage two re-scores only those rows with the full
+# vectors (usually the on-disk mmap, so only shortlisted rows are read).
+#
+# Same search()/add() interface as VectorIndex.
+#
+import os
+import numpy as np
+
+from retrieval import EMPTY_RESULT, normalise_rows, top_k, unit_query
+
+KB_TWO_STAGE  = os.getenv("KB_TWO_STAGE", "0") == "1"
+PREFIX_DIM    = int(os.getenv("KB_PREFIX_DIM", "256"))
+SHORTLIST     = int(os.getenv("KB_SHORTLIST", "100"))
+
+
+def prefix_rows(matrix, prefix_dim: int = PREFIX_DIM) -> np.ndarray:
+    """First `prefix_dim` dims of every row, re-normalised, as one contiguous float32 block."""
+    return normalise_rows(np.asarray(matrix)[:, :prefix_dim])
+
+
+class TwoStageIndex:
+    def __init__(self, matrix=None, prefix=None, shortlist: int = SHORTLIST, prefix_dim: int = PREFIX_DIM):
+        """`matrix` must be row-normalised; `prefix` is computed from it when not given."""
+        self.matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32)
+        if prefix is None:
+            prefix = prefix_rows(self.matrix, prefix_dim) if len(self.matrix) else np.zeros((0, 0), dtype=np.float32)
+        self.prefix = np.ascontiguousarray(prefix, dtype=np.float32)
+        self.shortlist = shortlist
+        self.prefix_dim = prefix_dim
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.prefix.nbytes
+
+    def add(self, vec):
+        """Append one embedding, or a matrix of them (kept fully in memory)."""
+        row = normalise_rows(vec)
+        if not len(self):
+            self.matrix, self.prefix = row, prefix_rows(row, self.prefix_dim)
+        else:
+            self.matrix = np.ascontiguousarray(np.vstack([self.matrix, row]))
+            self.prefix = np.ascontiguousarray(np.vstack([self.prefix, prefix_rows(row, self.prefix_dim)]))
+
+    def search(self, q_vec, k, threshold=None, shortlist: int = None):
+        """Return (scores, indices) of the best `k` rows by full-vector cosine, among the prefix shortlist."""
+        q = unit_query(q_vec)
+        if q is None or not len(self) or k <= 0:
+            return EMPTY_RESULT
+        qp = unit_query(q[:self.prefix.shape[1]])
+        if qp is None:
+            return EMPTY_RESULT
+        _, cand = top_k(self.prefix @ qp, max(k, shortlist or self.shortlist))
+        cand = np.sort(cand)
+        top, pos = top_k(np.asarray(self.matrix[cand]) @ q, k, threshold)
+        return top, cand[pos]